@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture
+def query_budget(db):
+    """Запрашивает страницу и проверяет бюджет SQL-запросов её view."""
+    from django.core.cache import cache
+
+    from core.queries import assert_view_budget
+
+    def check(client, url, **extra):
+        cache.clear()
+        return assert_view_budget(client, url, **extra)
+
+    return check
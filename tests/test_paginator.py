@@ -50,3 +50,14 @@ class TestGroupPaginatorView:
             'Проверьте, что переменная `paginator` объекта `page_obj`'
             ' на странице `/profile/<username>/` типа `Paginator`'
         )
+
+    @pytest.mark.parametrize('url', [
+        '/', '/group/test-link/', '/profile/TestUser/',
+    ])
+    def test_paginator_view_query_budget(
+        self, user_client, few_posts_with_group, query_budget, url
+    ):
+        response = query_budget(user_client, url)
+        assert response.status_code == 200, (
+            f'Страница `{url}` должна открываться в пределах бюджета запросов'
+        )
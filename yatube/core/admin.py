@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'recipient', 'subject', 'status', 'attempts', 'next_attempt_at',
+        'sent_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject')
@@ -1,5 +1,27 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.contrib.admin.apps import SimpleAdminConfig
 
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .db import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas)
+
+
+class AdminConfig(SimpleAdminConfig):
+    """
+    Админка, которая с ADMIN_LAZY_AUTODISCOVER не загружает admin.py
+    приложений при старте: это делает первый запрос к /admin/
+    (core.lazy_admin).
+    """
+
+    def ready(self):
+        super().ready()
+        if not settings.ADMIN_LAZY_AUTODISCOVER:
+            self.module.autodiscover()
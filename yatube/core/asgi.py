@@ -0,0 +1,194 @@
+"""
+ASGI-приложение поверх Django 2.2.
+
+Своего ASGI в Django 2.2 нет, поэтому ASGIHandler сам переводит scope в
+environ WSGI. Тело запроса читается, а ответ отправляется в цикле
+событий: медленный клиент занимает только корутину. Middleware и
+представление выполняются в пуле из ASGI_THREADS потоков, как под WSGI:
+ORM Django 2.2 синхронный, и запрос к БД всё равно занимает поток.
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core import signals
+from django.core.handlers import base
+from django.core.handlers.wsgi import WSGIRequest, get_script_name
+from django.urls import set_script_prefix
+
+ASGI_KEY = "yatube.asgi"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASGI_THREADS,
+                thread_name_prefix="yatube-asgi",
+            )
+    return _executor
+
+
+class ASGIHandler(base.BaseHandler):
+    request_class = WSGIRequest
+    chunk_size = 64 * 1024
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Неподдерживаемый тип: {scope['type']}")
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        executor = get_executor()
+        environ = self.get_environ(scope, body)
+        response = await loop.run_in_executor(executor, self.handle, environ)
+        try:
+            await self.send_response(
+                response, send, loop, executor,
+                with_body=scope["method"] != "HEAD",
+            )
+        finally:
+            # close() шлёт request_finished и закрывает старые соединения.
+            await loop.run_in_executor(executor, response.close)
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса во временный файл; None, если клиент ушёл."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode="w+b"
+        )
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return None
+            body.write(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body.seek(0)
+        return body
+
+    @staticmethod
+    def get_environ(scope, body):
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        if path.startswith(root_path):
+            path = path[len(root_path):]
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        length = body.seek(0, 2)
+        body.seek(0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            # WSGI передаёт путь байтами в latin-1.
+            "SCRIPT_NAME": root_path.encode().decode("latin-1"),
+            "PATH_INFO": path.encode().decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": str(server[0]),
+            "SERVER_PORT": str(server[1]),
+            "REMOTE_ADDR": client[0],
+            "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+            "CONTENT_LENGTH": str(length),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+            ASGI_KEY: True,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_LENGTH":
+                continue
+            if name != "CONTENT_TYPE":
+                name = "HTTP_" + name
+            if name in environ:
+                value = environ[name] + "," + value
+            environ[name] = value
+        return environ
+
+    def handle(self, environ):
+        """То же, что WSGIHandler.__call__, но возвращает ответ целиком."""
+        set_script_prefix(get_script_name(environ))
+        signals.request_started.send(sender=self.__class__, environ=environ)
+        request = self.request_class(environ)
+        response = self.get_response(request)
+        response._handler_class = self.__class__
+        return response
+
+    async def send_response(self, response, send, loop, executor,
+                            with_body=True):
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append(
+                (b"Set-Cookie", cookie.output(header="").strip().encode())
+            )
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": headers,
+        })
+        if with_body:
+            await self.send_body(response, send, loop, executor)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send_body(self, response, send, loop, executor):
+        if response.streaming:
+            # Итератор может читать файл или БД - только в пуле.
+            chunks = iter(response)
+            while True:
+                chunk = await loop.run_in_executor(
+                    executor, next, chunks, None
+                )
+                if chunk is None:
+                    break
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": True,
+                })
+        else:
+            content = response.content
+            for start in range(0, len(content), self.chunk_size):
+                await send({
+                    "type": "http.response.body",
+                    "body": content[start:start + self.chunk_size],
+                    "more_body": True,
+                })
+
+
+def get_asgi_application():
+    import django
+
+    django.setup(set_prefix=False)
+    return ASGIHandler()
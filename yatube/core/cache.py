@@ -0,0 +1,258 @@
+"""
+Кэш, общий для всех процессов-воркеров на хосте.
+
+Записи лежат в файле SQLite в режиме WAL: читатели не блокируют друг
+друга, файл читается через mmap. Размер ограничен MAX_ENTRIES, при
+переполнении вытесняются давно не читавшиеся записи (LRU). incr атомарен
+между процессами: чтение и запись идут в одной транзакции BEGIN IMMEDIATE.
+Соединения переиспользуются: одно на поток процесса.
+
+Значения хранятся в pickle, поэтому файл создаётся с правами 0600, а
+чужой файл (другого владельца) бэкенд не открывает.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache ("
+    "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+    "expires REAL, accessed REAL NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)",
+)
+
+
+def _create_private(path):
+    """Создаёт файл кэша с правами 0600 и проверяет владельца."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    descriptor = os.open(
+        path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600
+    )
+    try:
+        if not hasattr(os, "getuid"):
+            return
+        info = os.fstat(descriptor)
+        if info.st_uid != os.getuid():
+            raise ImproperlyConfigured(
+                f"Файл кэша {path} принадлежит другому пользователю"
+            )
+        if info.st_mode & 0o077:
+            os.fchmod(descriptor, 0o600)
+    finally:
+        os.close(descriptor)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Бэкенд Django-кэша на файле SQLite.
+
+    LOCATION - путь к файлу. Кроме стандартных MAX_ENTRIES и
+    CULL_FREQUENCY понимает OPTIONS: MMAP_SIZE (байт файла в mmap),
+    TOUCH_INTERVAL (не чаще какого интервала, в секундах, обновлять
+    время чтения записи для LRU), CULL_EVERY (через сколько записей
+    процесса проверять переполнение: COUNT(*) на каждую запись дорог).
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = location
+        self._mmap_size = int(options.get("MMAP_SIZE", 64 * 1024 * 1024))
+        self._touch_interval = float(options.get("TOUCH_INTERVAL", 10))
+        self._cull_every = int(options.get("CULL_EVERY", 100))
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connection(self):
+        # После fork соединение родителя использовать нельзя.
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        _create_private(self._path)
+        connection = sqlite3.connect(
+            self._path, timeout=5, isolation_level=None
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(f"PRAGMA mmap_size = {self._mmap_size}")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _write(self):
+        """Транзакция записи: блокировка берётся сразу, без апгрейда."""
+        return _Transaction(self._connection())
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _fetch(self, keys):
+        """Живые записи {ключ: значение}; время чтения обновляется."""
+        if not keys:
+            return {}
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT key, value, accessed FROM cache "
+            f"WHERE key IN ({', '.join('?' * len(keys))}) "
+            "AND (expires IS NULL OR expires > ?)",
+            [*keys, now],
+        ).fetchall()
+        stale = [key for key, _, accessed in rows
+                 if now - accessed > self._touch_interval]
+        if stale:
+            # Запись ради LRU делаем редко: чтение остаётся без блокировок.
+            with self._write() as connection:
+                connection.executemany(
+                    "UPDATE cache SET accessed = ? WHERE key = ?",
+                    [(now, key) for key in stale],
+                )
+        return {key: pickle.loads(value) for key, value, _ in rows}
+
+    def _store(self, connection, key, value, expires, mode="REPLACE"):
+        cursor = connection.execute(
+            f"INSERT OR {mode} INTO cache (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?)",
+            [key, pickle.dumps(value, self.pickle_protocol), expires,
+             time.time()],
+        )
+        return cursor.rowcount > 0
+
+    def _cull(self, connection, writes=1):
+        with self._writes_lock:
+            self._writes += writes
+            if self._writes < self._cull_every:
+                return
+            self._writes = 0
+        count = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count <= self._max_entries:
+            return
+        connection.execute(
+            "DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?",
+            [time.time()],
+        )
+        count = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY accessed LIMIT ?)",
+                [max(count // self._cull_frequency, 1)
+                 if self._cull_frequency else count],
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._fetch([key])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        with self._write() as connection:
+            self._store(connection, key, value, expires)
+            self._cull(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        with self._write() as connection:
+            for key, value in data.items():
+                self._store(
+                    connection, self._key(key, version), value, expires
+                )
+            self._cull(connection, len(data))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            connection.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?",
+                [key, time.time()],
+            )
+            added = self._store(
+                connection, key, value, self.get_backend_timeout(timeout),
+                mode="IGNORE",
+            )
+            if added:
+                self._cull(connection)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            cursor = connection.execute(
+                "UPDATE cache SET expires = ? WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                [self.get_backend_timeout(timeout), key, time.time()],
+            )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            row = connection.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                [key, time.time()],
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                "UPDATE cache SET value = ?, accessed = ? WHERE key = ?",
+                [pickle.dumps(value, self.pickle_protocol), time.time(), key],
+            )
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if not keys:
+            return
+        placeholders = ", ".join("?" * len(keys))
+        with self._write() as connection:
+            connection.execute(
+                f"DELETE FROM cache WHERE key IN ({placeholders})", keys
+            )
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Соединение потока остаётся открытым между запросами - это пул.
+        pass
+
+
+class _Transaction:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,16 @@
+"""
+Настройка соединений SQLite.
+
+При каждом новом соединении выполняются PRAGMA из SQLITE_PRAGMAS
+(см. профили SQLITE_PROFILES в settings): WAL, чтобы читатели не ждали
+пишущих, synchronous=NORMAL, mmap, размер кэша страниц и busy_timeout.
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
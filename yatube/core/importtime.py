@@ -0,0 +1,63 @@
+"""
+Разбор вывода ``python -X importtime`` по приложениям.
+
+Каждая строка вывода - модуль, собственное время импорта и время вместе
+с вложенными импортами (мкс). Собственное время модуля относится к
+приложению INSTALLED_APPS с самым длинным совпадающим именем, остальное
+- к пакету верхнего уровня (django, PIL, pkg_resources...).
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+
+
+def run_importtime(module):
+    """Импортирует module в чистом процессе и возвращает строки stderr."""
+    env = dict(os.environ, YATUBE_WARMUP="0")
+    env.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=settings.BASE_DIR, env=env, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True,
+    )
+    return result.stderr.splitlines()
+
+
+def parse(lines):
+    """[(модуль, собственное мкс, всего мкс)] из вывода importtime."""
+    entries = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        own, total, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue  # заголовок
+        entries.append((name.strip(), int(own), int(total)))
+    return entries
+
+
+def group_of(module, app_names):
+    for name in app_names:
+        if module == name or module.startswith(name + "."):
+            return name
+    return module.split(".")[0]
+
+
+def aggregate(entries, app_names=None):
+    """{группа: (собственное мкс, число модулей)}, по убыванию времени."""
+    if app_names is None:
+        app_names = [config.name for config in apps.get_app_configs()]
+    app_names = sorted(app_names, key=len, reverse=True)
+    groups = defaultdict(lambda: [0, 0])
+    for module, own, _ in entries:
+        group = groups[group_of(module, app_names)]
+        group[0] += own
+        group[1] += 1
+    return dict(sorted(
+        ((name, tuple(value)) for name, value in groups.items()),
+        key=lambda item: item[1][0], reverse=True,
+    ))
@@ -0,0 +1,67 @@
+"""
+Ленивое подключение админки.
+
+Модули admin.py приложений и маршруты ModelAdmin нужны только
+редакторам, поэтому воркер загружает их при первом запросе к /admin/
+или reverse("admin:..."), а не при старте.
+"""
+import threading
+
+from django.urls import URLResolver
+from django.urls.resolvers import RoutePattern
+
+
+class LazyAdminURLconf:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._patterns = None
+
+    @property
+    def urlpatterns(self):
+        with self._lock:
+            if self._patterns is None:
+                from django.contrib import admin
+
+                # Повторный вызов безопасен: модули уже импортированы.
+                admin.autodiscover()
+                self._patterns = admin.site.get_urls()
+        return self._patterns
+
+
+class LazyAdminResolver(URLResolver):
+    """
+    Корневой резолвер заполняет вложенные сразу (_populate при первом
+    reverse), этот - только когда спрашивают его собственные имена.
+    """
+
+    requested = False
+
+    def _populate(self):
+        if self.requested:
+            super()._populate()
+
+    def _request(self):
+        self.requested = True
+
+    @property
+    def reverse_dict(self):
+        self._request()
+        return super().reverse_dict
+
+    @property
+    def namespace_dict(self):
+        self._request()
+        return super().namespace_dict
+
+    @property
+    def app_dict(self):
+        self._request()
+        return super().app_dict
+
+
+def admin_urls(route="admin/"):
+    """Замена path("admin/", admin.site.urls)."""
+    return LazyAdminResolver(
+        RoutePattern(route), LazyAdminURLconf(),
+        app_name="admin", namespace="admin",
+    )
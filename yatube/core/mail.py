@@ -0,0 +1,173 @@
+"""
+Исходящая почта через очередь в базе (outbox).
+
+EMAIL_BACKEND = "core.mail.OutboxEmailBackend": send_mail и письма
+Django (сброс пароля) только записывают строки OutgoingEmail в текущей
+транзакции. После коммита deliver_outbox в фоновом потоке (core.tasks)
+отправляет готовые письма пачками по OUTBOX_BATCH_SIZE через одно
+соединение OUTBOX_EMAIL_BACKEND. Неудачная попытка повторяется через
+OUTBOX_RETRY_DELAY * 2 ** (попытка - 1) секунд, после OUTBOX_MAX_ATTEMPTS
+письмо помечается как failed. Отложенные повторы забирает
+``manage.py send_outbox`` (по cron или с --loop).
+"""
+import datetime
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import OutgoingEmail
+from .tasks import run_in_background
+
+logger = logging.getLogger(__name__)
+
+# Письмо «отправляется» дольше этого - воркер упал, письмо снова в очереди.
+CLAIM_TIMEOUT = datetime.timedelta(minutes=10)
+
+_state_lock = threading.Lock()
+_running = False
+_requested = False
+
+
+def enqueue(messages):
+    """Кладёт письма в очередь, по строке на получателя."""
+    rows = []
+    for message in messages:
+        html_body = ""
+        for content, mimetype in getattr(message, "alternatives", []):
+            if mimetype == "text/html":
+                html_body = content
+        for recipient in message.recipients():
+            rows.append(OutgoingEmail(
+                subject=message.subject,
+                body=message.body,
+                html_body=html_body,
+                from_email=message.from_email,
+                recipient=recipient,
+            ))
+    OutgoingEmail.objects.bulk_create(rows, batch_size=1000)
+    if rows:
+        run_in_background(deliver_outbox)
+    return len(rows)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Бэкенд Django: вместо отправки ставит письма в очередь."""
+
+    def send_messages(self, email_messages):
+        return enqueue(email_messages)
+
+
+def _claim(batch_size):
+    """Помечает пачку готовых писем как отправляемые этим воркером."""
+    now = timezone.now()
+    OutgoingEmail.objects.filter(
+        status=OutgoingEmail.SENDING, claimed_at__lt=now - CLAIM_TIMEOUT
+    ).update(status=OutgoingEmail.PENDING)
+    ids = list(
+        OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING, next_attempt_at__lte=now
+        ).order_by("next_attempt_at").values_list("pk", flat=True)
+        [:batch_size]
+    )
+    if not ids:
+        return []
+    claim = uuid.uuid4()
+    # Письмо могли забрать параллельно - берём только то, что обновили мы.
+    OutgoingEmail.objects.filter(
+        pk__in=ids, status=OutgoingEmail.PENDING
+    ).update(status=OutgoingEmail.SENDING, claim=claim, claimed_at=now)
+    return list(OutgoingEmail.objects.filter(claim=claim))
+
+
+def _as_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, [email.recipient],
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def _retry(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+        logger.error("Письмо %s не отправлено: %s", email.pk, error)
+    else:
+        email.status = OutgoingEmail.PENDING
+        email.next_attempt_at = timezone.now() + datetime.timedelta(
+            seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+        )
+    email.claim = None
+    email.save(update_fields=[
+        "attempts", "last_error", "status", "next_attempt_at", "claim",
+    ])
+
+
+def _send_batch(connection, batch):
+    delivered = []
+    for email in batch:
+        try:
+            if not connection.send_messages([_as_message(email, connection)]):
+                raise RuntimeError("бэкенд не отправил письмо")
+        except Exception as error:
+            _retry(email, error)
+        else:
+            delivered.append(email.pk)
+    OutgoingEmail.objects.filter(pk__in=delivered).update(
+        status=OutgoingEmail.SENT, sent_at=timezone.now(), claim=None,
+    )
+    return len(delivered)
+
+
+def _deliver_due():
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    try:
+        connection.open()
+    except Exception as error:
+        for email in _claim(settings.OUTBOX_BATCH_SIZE):
+            _retry(email, error)
+        return 0
+    sent = 0
+    try:
+        batch = _claim(settings.OUTBOX_BATCH_SIZE)
+        while batch:
+            sent += _send_batch(connection, batch)
+            batch = _claim(settings.OUTBOX_BATCH_SIZE)
+    finally:
+        connection.close()
+    return sent
+
+
+def deliver_outbox():
+    """
+    Отправляет все готовые письма; возвращает число отправленных.
+
+    В процессе работает один отправитель: если он уже занят, то после
+    текущего прохода сделает ещё один и заберёт новые письма.
+    """
+    global _running, _requested
+    with _state_lock:
+        if _running:
+            _requested = True
+            return 0
+        _running = True
+    sent = 0
+    try:
+        while True:
+            with _state_lock:
+                _requested = False
+            sent += _deliver_due()
+            with _state_lock:
+                if not _requested:
+                    return sent
+    finally:
+        with _state_lock:
+            _running = False
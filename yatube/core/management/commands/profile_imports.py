@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.importtime import aggregate, parse, run_importtime
+
+
+class Command(BaseCommand):
+    help = (
+        "Профиль импорта воркера (python -X importtime) с суммой по "
+        "приложениям и пакетам и самыми долгими модулями."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--module", default="yatube.wsgi",
+            help="Что импортировать (по умолчанию - точка входа WSGI).",
+        )
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **options):
+        entries = parse(run_importtime(options["module"]))
+        groups = aggregate(entries)
+        slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)
+        total = sum(own for _, own, _ in entries)
+        if options["json"]:
+            self.stdout.write(json.dumps({
+                "total_ms": total / 1000,
+                "groups": {
+                    name: {"ms": own / 1000, "modules": count}
+                    for name, (own, count) in groups.items()
+                },
+                "modules": [
+                    {"module": name, "ms": own / 1000, "total_ms": cum / 1000}
+                    for name, own, cum in slowest[:options["limit"]]
+                ],
+            }, indent=2))
+            return
+        self.stdout.write(
+            f"Импорт {options['module']}: {total / 1000:.1f} мс, "
+            f"модулей {len(entries)}"
+        )
+        self.stdout.write("\nПо приложениям и пакетам:")
+        for name, (own, count) in list(groups.items())[:options["limit"]]:
+            self.stdout.write(f"{own / 1000:9.1f} мс {count:5} {name}")
+        self.stdout.write("\nСамые долгие модули (собственное время):")
+        for name, own, cum in slowest[:options["limit"]]:
+            self.stdout.write(
+                f"{own / 1000:9.1f} мс {cum / 1000:9.1f} мс всего  {name}"
+            )
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Отправляет готовые письма из очереди, включая отложенные "
+        "повторы. С --loop работает постоянно."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument(
+            "--interval", type=float, default=10,
+            help="Пауза между проходами в секундах (с --loop).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = deliver_outbox()
+            self.stdout.write(f"Отправлено писем: {sent}")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
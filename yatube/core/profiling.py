@@ -0,0 +1,221 @@
+"""
+Выборочное профилирование запросов в продакшене.
+
+ProfilingMiddleware профилирует долю PROFILING_SAMPLE_RATE запросов:
+SQL (число и время), отрисовку каждого шаблона и попадания в кэш.
+Остальные запросы только засекаются, чтобы не пропустить медленные.
+Медленные запросы (дольше PROFILING_SLOW_REQUEST секунд) пишутся JSON в
+лог ``yatube.slow_requests``, сводные гистограммы отдаёт /metrics в
+формате Prometheus. Метрики свои у каждого процесса воркера.
+"""
+import bisect
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .queries import QueryRecorder
+
+logger = logging.getLogger("yatube.slow_requests")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = False
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Гистограммы и счётчики процесса; меняются под блокировкой."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)
+        self.counters = defaultdict(float)
+
+    def record(self, profile):
+        view = profile["view"]
+        with self.lock:
+            self.histograms["request", view].observe(profile["duration"])
+            self.histograms["db", view].observe(profile["db_time"])
+            self.counters["queries", view] += profile["queries"]
+            self.counters["cache_hits", view] += profile["cache_hits"]
+            self.counters["cache_misses", view] += profile["cache_misses"]
+            for name, seconds in profile["templates"].items():
+                self.histograms["template", name].observe(seconds)
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def export(self):
+        """Текст в формате Prometheus exposition."""
+        names = {
+            "request": ("yatube_request_seconds", "view"),
+            "db": ("yatube_request_db_seconds", "view"),
+            "template": ("yatube_template_render_seconds", "template"),
+            "queries": ("yatube_db_queries_total", "view"),
+            "cache_hits": ("yatube_cache_hits_total", "view"),
+            "cache_misses": ("yatube_cache_misses_total", "view"),
+        }
+        lines = []
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        for kind in ("request", "db", "template"):
+            metric, label = names[kind]
+            lines.append(f"# TYPE {metric} histogram")
+            for (name, value), histogram in histograms:
+                if name != kind:
+                    continue
+                labels = f'{label}="{_escape(value)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{metric}_bucket{{{labels},le="{bound}"}} '
+                        f"{cumulative}"
+                    )
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        for kind in ("queries", "cache_hits", "cache_misses"):
+            metric, label = names[kind]
+            lines.append(f"# TYPE {metric} counter")
+            for (name, value), total in counters:
+                if name == kind:
+                    lines.append(
+                        f'{metric}{{{label}="{_escape(value)}"}} {total:g}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+metrics = Metrics()
+
+
+def _current():
+    return getattr(_local, "profile", None)
+
+
+def _install():
+    """Оборачивает отрисовку шаблона и чтение из кэша (один раз)."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.template.base import Template
+
+        render = Template._render
+
+        def timed_render(self, context):
+            profile = _current()
+            if profile is None:
+                return render(self, context)
+            started = time.perf_counter()
+            try:
+                return render(self, context)
+            finally:
+                templates = profile["templates"]
+                name = self.origin.template_name or "<string>"
+                templates[name] = templates.get(name, 0) + (
+                    time.perf_counter() - started
+                )
+
+        Template._render = timed_render
+
+        backend = type(caches["default"])
+        get, get_many = backend.get, backend.get_many
+        missing = object()
+
+        def counted_get(self, key, default=None, version=None):
+            profile = _current()
+            value = get(self, key, missing, version=version)
+            if profile is not None:
+                profile["cache_misses" if value is missing
+                        else "cache_hits"] += 1
+            return default if value is missing else value
+
+        def counted_get_many(self, keys, version=None):
+            profile = _current()
+            keys = list(keys)
+            found = get_many(self, keys, version=version)
+            if profile is not None:
+                profile["cache_hits"] += len(found)
+                profile["cache_misses"] += len(keys) - len(found)
+            return found
+
+        backend.get, backend.get_many = counted_get, counted_get_many
+        _installed = True
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow = settings.PROFILING_SLOW_REQUEST
+        if self.sample_rate:
+            _install()
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            duration = time.perf_counter() - started
+            if duration >= self.slow:
+                self.log(request, response, {"duration": duration})
+            return response
+
+        profile = _local.profile = {
+            "templates": {}, "cache_hits": 0, "cache_misses": 0,
+        }
+        try:
+            with QueryRecorder() as recorder:
+                started = time.perf_counter()
+                response = self.get_response(request)
+                profile["duration"] = time.perf_counter() - started
+        finally:
+            _local.profile = None
+        match = request.resolver_match
+        profile.update({
+            "view": match.view_name if match else "<unresolved>",
+            "queries": len(recorder),
+            "db_time": recorder.total_time,
+        })
+        metrics.record(profile)
+        if profile["duration"] >= self.slow:
+            profile["duplicate_queries"] = recorder.duplicates()
+            self.log(request, response, profile)
+        return response
+
+    def log(self, request, response, profile):
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "sampled": "queries" in profile,
+            **profile,
+        }
+        logger.warning(json.dumps(record, ensure_ascii=False, default=str))
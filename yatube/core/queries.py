@@ -0,0 +1,125 @@
+"""
+Бюджеты SQL-запросов для представлений.
+
+Бюджет объявляется у представления декоратором ``@query_budget(3)`` и
+считается на весь запрос вошедшего пользователя с холодным кэшем
+(сессия и пользователь входят в число). В тестах его проверяет
+assert_view_budget (и pytest-фикстура ``query_budget`` в tests/): при
+превышении в ошибке печатаются все запросы, повторы помечены отдельно -
+так видно N+1 в шаблонах.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.urls import resolve
+
+_NUMBERS = re.compile(r"\b\d+\b")
+_IN_LIST = re.compile(r"IN \([^)]*\)")
+
+
+def query_budget(queries, seconds=None):
+    """Объявляет бюджет представления: число запросов и их общее время."""
+
+    def decorator(view):
+        view.query_budget = (queries, seconds)
+        return view
+
+    return decorator
+
+
+class QueryRecorder:
+    """
+    Записывает запросы через execute_wrapper: по умолчанию всех
+    соединений потока, включая реплики, иначе - только using.
+    """
+
+    def __init__(self, using=None):
+        self.using = using
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "sql": sql,
+                "params": params,
+                "alias": context["connection"].alias,
+                "time": time.perf_counter() - started,
+            })
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        targets = (
+            [connections[self.using]] if self.using else connections.all()
+        )
+        for target in targets:
+            self._wrappers.enter_context(target.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._wrappers.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(query["time"] for query in self.queries)
+
+    def duplicates(self):
+        """{шаблон SQL: повторов}: запросы, различающиеся лишь параметрами."""
+        shapes = Counter(
+            _IN_LIST.sub("IN (...)", _NUMBERS.sub("?", query["sql"]))
+            for query in self.queries
+        )
+        return {sql: count for sql, count in shapes.items() if count > 1}
+
+    def report(self):
+        lines = []
+        for number, query in enumerate(self.queries, 1):
+            lines.append(
+                f"{number}. [{query['time'] * 1000:.1f} мс, "
+                f"{query['alias']}] {query['sql']}"
+            )
+        duplicates = self.duplicates()
+        if duplicates:
+            lines.append("Повторяющиеся запросы:")
+            lines.extend(
+                f"  {count} x {sql}" for sql, count in duplicates.items()
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def assert_max_queries(queries, seconds=None, label="Блок"):
+    """Проверяет, что внутри блока не больше queries запросов."""
+    with QueryRecorder() as recorder:
+        yield recorder
+    errors = []
+    if len(recorder) > queries:
+        errors.append(f"{len(recorder)} SQL-запросов при бюджете {queries}")
+    if seconds is not None and recorder.total_time > seconds:
+        errors.append(
+            f"запросы заняли {recorder.total_time * 1000:.1f} мс "
+            f"при бюджете {seconds * 1000:.1f} мс"
+        )
+    if errors:
+        raise AssertionError(
+            f"{label}: {', '.join(errors)}\n{recorder.report()}"
+        )
+
+
+def assert_view_budget(client, url, **extra):
+    """GET url клиентом с проверкой бюджета его представления."""
+    view = resolve(url.split("?")[0]).func
+    budget = getattr(view, "query_budget", None)
+    if budget is None:
+        raise AssertionError(f"У представления {url} не объявлен бюджет")
+    with assert_max_queries(*budget, label=url):
+        response = client.get(url, **extra)
+    return response
@@ -0,0 +1,145 @@
+"""
+Чтение лент с реплик.
+
+Представления, помеченные ``@use_replica``, читают с одной из здоровых
+реплик DATABASE_REPLICAS, всё остальное - с default. Запись всегда идёт
+в default и закрепляет за ним остаток запроса, а ReplicaPinMiddleware
+ставит cookie на REPLICA_PIN_SECONDS: следующие запросы того же
+посетителя тоже читают с default и видят свои изменения, пока реплика
+догоняет. Здоровье реплики проверяется ``SELECT 1`` не чаще раза в
+REPLICA_HEALTH_INTERVAL секунд, упавшая реплика пропускается.
+
+Кэши страниц и карточек сбрасываются сменой версии, а версия
+(new_version) помнит время смены. Ответ, прочитанный с реплики в первые
+REPLICA_PIN_SECONDS после смены, в кэш не кладётся (may_be_stale):
+иначе отставшая реплика вернула бы в кэш старый HTML на весь таймаут.
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "pin_primary"
+
+_state = threading.local()
+_health = {}
+_health_lock = threading.Lock()
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    with _health_lock:
+        checked = _health.get(alias)
+        if checked and now - checked[0] < settings.REPLICA_HEALTH_INTERVAL:
+            return checked[1]
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+        healthy = True
+    except Exception:
+        logger.warning("Реплика %s недоступна", alias, exc_info=True)
+        connections[alias].close()
+        healthy = False
+    with _health_lock:
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """Случайная здоровая реплика или None."""
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+def new_version():
+    """Токен версии кэша со временем смены."""
+    return f"{uuid.uuid4().hex}.{int(time.time())}"
+
+
+def may_be_stale(*versions):
+    """
+    Запрос читал с реплики, а одна из версий сменилась недавно: реплика
+    могла ещё не получить изменение.
+    """
+    if not getattr(_state, "used_replica", False):
+        return False
+    changed_at = 0
+    for version in versions:
+        # Версии старого формата (без времени) считаем давними.
+        _, dot, stamp = version.rpartition(".")
+        if dot:
+            changed_at = max(changed_at, int(stamp))
+    return time.time() - changed_at < settings.REPLICA_PIN_SECONDS
+
+
+def use_replica(view):
+    """Разрешает представлению читать с реплики."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        previous = getattr(_state, "replica", False)
+        _state.replica = not getattr(_state, "pinned", False)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = previous
+
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, "replica", False) or not (
+            settings.DATABASE_REPLICAS
+        ):
+            return DEFAULT_DB_ALIAS
+        alias = choose_replica()
+        if alias is None:
+            return DEFAULT_DB_ALIAS
+        _state.used_replica = True
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # После записи запрос читает только с default.
+        _state.replica = False
+        _state.pinned = _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему репликацией.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = PIN_COOKIE in request.COOKIES
+        _state.replica = _state.wrote = _state.used_replica = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.pinned = _state.replica = _state.wrote = False
+            _state.used_replica = False
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite="Lax",
+            )
+        return response
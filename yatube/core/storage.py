@@ -0,0 +1,171 @@
+"""
+Сборка статики: хэшированные имена, минификация и сжатые копии.
+
+STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage".
+``manage.py collectstatic`` сначала хэширует файлы, как это делает
+ManifestStaticFilesStorage: bootstrap.min.css превращается в
+bootstrap.min.<md5>.css, а манифест лежит в STATIC_ROOT/staticfiles.json.
+{% static %} и static() в Jinja2 берут имена из этого манифеста. Затем
+пул процессов на STATIC_BUILD_WORKERS ядер обрабатывает хэшированные
+файлы. CSS и JS без ".min." в имени минифицируются на месте. Рядом с
+текстовыми файлами пишутся копии .gz и, если установлен Brotli
+(pip install Brotli), копии .br.
+
+Хэш считается по исходнику, до минификации. Он меняется вместе с
+исходником, и этого достаточно, чтобы сбросить кэш. Содержимое
+хэшированного имени не меняется никогда, поэтому отдавать его можно с
+Cache-Control: immutable (core.views.static_file или веб-сервер).
+"""
+import gzip
+import importlib.util
+import io
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Строки и комментарии CSS: внутри строк пробелы не трогаем.
+_CSS_SKIP = re.compile(
+    r"(\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'|/\*[\s\S]*?\*/)"
+)
+_CSS_PUNCTUATION = re.compile(r" ?([{};,>]) ?")
+
+
+def minify_css(text):
+    """Убирает комментарии (кроме /*! ... */) и лишние пробелы."""
+    parts = []
+    for index, part in enumerate(_CSS_SKIP.split(text)):
+        if index % 2 and not part.startswith("/*"):
+            parts.append(part)
+        elif index % 2:
+            parts.append(part if part.startswith("/*!") else " ")
+        else:
+            part = re.sub(r"\s+", " ", part)
+            part = _CSS_PUNCTUATION.sub(r"\1", part).replace(": ", ":")
+            parts.append(part.replace(";}", "}"))
+    return "".join(parts).strip()
+
+
+def minify_js(text):
+    """
+    Убирает отступы, пустые строки и строки-комментарии //.
+
+    Переводы строк остаются (на них держится расстановка ;). Файлы с
+    шаблонными строками и переносами строк через \\ не трогаются.
+    """
+    if "`" in text or re.search(r"\\\r?\n", text):
+        return text
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(
+        line for line in lines if line and not line.startswith("//")
+    ) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def _gzip(data):
+    buffer = io.BytesIO()
+    # mtime=0: одинаковый исходник - одинаковый .gz.
+    with gzip.GzipFile(
+        fileobj=buffer, mode="wb", compresslevel=9, mtime=0
+    ) as output:
+        output.write(data)
+    return buffer.getvalue()
+
+
+def _brotli(data):
+    import brotli
+
+    return brotli.compress(data, quality=11)
+
+
+def build_file(path, minify):
+    """
+    Минифицирует файл и пишет рядом сжатые копии (в процессе пула).
+
+    Копия пишется, только если она меньше исходника хотя бы на 5%.
+    Возвращает {суффикс: размер} записанных копий.
+    """
+    extension = os.path.splitext(path)[1]
+    with open(path, "rb") as source:
+        data = source.read()
+    if minify and extension in MINIFIERS:
+        try:
+            text = data.decode()
+        except UnicodeDecodeError:
+            # Не UTF-8 - оставляем как есть, только сжимаем.
+            text = None
+        if text is not None:
+            data = MINIFIERS[extension](text).encode()
+            with open(path, "wb") as target:
+                target.write(data)
+    compressors = [(".gz", _gzip)]
+    if BROTLI_AVAILABLE:
+        compressors.append((".br", _brotli))
+    written = {}
+    for suffix, compress in compressors:
+        compressed = compress(data)
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, "wb") as target:
+                target.write(compressed)
+            written[suffix] = len(compressed)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hashed_names = (None, frozenset())
+        self.built_files = {}
+
+    def stored_name(self, name):
+        # Без манифеста (разработка, тесты) ссылаемся на исходное имя.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def is_hashed(self, name):
+        """Имя из манифеста: содержимое под ним не меняется."""
+        if self._hashed_names[0] is not self.hashed_files:
+            self._hashed_names = (
+                self.hashed_files, frozenset(self.hashed_files.values())
+            )
+        return name in self._hashed_names[1]
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            self.build(self.hashed_files)
+
+    def build(self, hashed_files):
+        """Минификация и сжатие хэшированных файлов в пуле процессов."""
+        # Хранилище нужно и {% static %} воркера - пул грузим только здесь.
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        extensions = settings.STATIC_COMPRESS_EXTENSIONS
+        jobs = [
+            (hashed_name, ".min." not in os.path.basename(name))
+            for name, hashed_name in sorted(hashed_files.items())
+            if os.path.splitext(name)[1] in extensions
+        ]
+        self.built_files = {}
+        if not jobs:
+            return self.built_files
+        workers = min(settings.STATIC_BUILD_WORKERS, len(jobs))
+        # spawn, как в core.tasks: процессы не наследуют состояние родителя.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                (name, executor.submit(build_file, self.path(name), minify))
+                for name, minify in jobs
+            ]
+            for name, future in futures:
+                self.built_files[name] = future.result()
+        return self.built_files
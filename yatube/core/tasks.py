@@ -0,0 +1,111 @@
+"""
+Фоновые задачи без внешнего брокера: пулы потоков и процессов воркера.
+
+Задача ставится в пул после коммита текущей транзакции, чтобы видеть
+записанные данные. С ``BACKGROUND_TASKS_EAGER = True`` (тесты, отладка)
+задача выполняется сразу в вызывающем потоке.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_process_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASK_WORKERS,
+                thread_name_prefix="yatube-task",
+            )
+    return _executor
+
+
+def init_process():
+    """Инициализатор дочернего процесса: поднимает Django."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    django.setup()
+
+
+def get_process_executor():
+    """Пул процессов для задач, упирающихся в CPU (обработка картинок)."""
+    # multiprocessing нужен только с первой картинкой - не при старте.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _process_executor
+    with _executor_lock:
+        if _process_executor is None:
+            # spawn: дочерний процесс не наследует сокеты БД родителя.
+            _process_executor = ProcessPoolExecutor(
+                max_workers=settings.BACKGROUND_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_process,
+            )
+    return _process_executor
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(
+            "Фоновая задача в процессе упала", exc_info=future.exception()
+        )
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Фоновая задача %s упала", func.__qualname__)
+    finally:
+        # Поток пула живёт долго - не держим открытые соединения с БД.
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) в пуле после коммита транзакции."""
+    if settings.BACKGROUND_TASKS_EAGER:
+        func(*args, **kwargs)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, func, args, kwargs)
+    )
+
+
+def run_in_process(func, *args, callback=None):
+    """
+    Выполняет func(*args) в пуле процессов после коммита транзакции.
+
+    func и аргументы должны сериализоваться pickle; callback(future)
+    вызывается в родительском процессе по завершении.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as error:
+            future.set_exception(error)
+            _log_failure(future)
+        if callback is not None:
+            callback(future)
+        return
+
+    def submit():
+        future = get_process_executor().submit(func, *args)
+        future.add_done_callback(_log_failure)
+        if callback is not None:
+            future.add_done_callback(callback)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,439 @@
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.asgi import ASGIHandler
+from core.cache import SQLiteCache
+from core.importtime import aggregate, parse
+from core.lazy_admin import admin_urls
+from core.mail import deliver_outbox
+from core.models import OutgoingEmail
+from core.profiling import metrics
+from core.queries import QueryRecorder
+from core.routers import (
+    PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter, is_healthy,
+    may_be_stale, new_version, use_replica
+)
+from core.storage import minify_css
+from core.views import static_file
+from core.warmup import warm_up
+from posts.models import Group, Post, User
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP недоступен")
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, "cache.sqlite3")
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        options.setdefault("TOUCH_INTERVAL", 0)
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_values_are_shared_between_instances(self):
+        self.cache.set("post", {"text": "Тест"})
+        self.cache.set_many({"a": 1, "b": 2})
+        other = self.make_cache()
+        self.assertEqual(other.get("post"), {"text": "Тест"})
+        self.assertEqual(other.get_many(["a", "b", "c"]), {"a": 1, "b": 2})
+        other.delete("a")
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_expired_value_is_not_returned(self):
+        self.cache.set("key", "value", timeout=-1)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.add("key", "new"))
+        self.assertFalse(self.cache.add("key", "newer"))
+        self.assertEqual(self.cache.get("key"), "new")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3, CULL_EVERY=1)
+        for key in ["a", "b", "c"]:
+            cache.set(key, key)
+        cache.get("a")
+        cache.set("d", "d")
+        self.assertEqual(
+            cache.get_many(["a", "b", "c", "d"]),
+            {"a": "a", "c": "c", "d": "d"},
+        )
+
+    def test_overflow_is_checked_every_n_writes(self):
+        cache = self.make_cache(MAX_ENTRIES=2, CULL_FREQUENCY=2, CULL_EVERY=4)
+        cache.set_many({"a": 1, "b": 2})
+        cache.set("c", 3)
+        self.assertEqual(len(cache.get_many(["a", "b", "c"])), 3)
+        cache.set("d", 4)
+        self.assertEqual(len(cache.get_many(["a", "b", "c", "d"])), 2)
+
+    def test_cache_file_is_private(self):
+        self.cache.set("key", "value")
+        self.assertEqual(os.stat(self.location).st_mode & 0o777, 0o600)
+        with mock.patch("os.getuid", return_value=os.getuid() + 1):
+            with self.assertRaises(ImproperlyConfigured):
+                self.make_cache().get("key")
+
+    def test_incr_is_atomic(self):
+        self.cache.set("counter", 0)
+
+        def increment():
+            for _ in range(50):
+                self.cache.incr("counter")
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get("counter"), 200)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SLOW_REQUEST=0)
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.clear()
+        author = User.objects.create_user(username="author")
+        Post.objects.create(text="Тестовый пост", author=author)
+
+    def test_sampled_request_is_logged_and_exported(self):
+        with self.assertLogs("yatube.slow_requests") as logs:
+            self.client.get(reverse("posts:index"))
+            exported = self.client.get(reverse("metrics")).content.decode()
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "posts:index")
+        self.assertGreater(record["queries"], 0)
+        self.assertIn("posts/index.html", record["templates"])
+        self.assertIn("includes/post.html", record["templates"])
+        self.assertIn(
+            'yatube_request_seconds_count{view="posts:index"} 1', exported
+        )
+        self.assertIn(
+            'yatube_template_render_seconds_count'
+            '{template="includes/post.html"}', exported
+        )
+        self.assertIn('yatube_cache_misses_total{view="posts:index"}',
+                      exported)
+
+    def test_metrics_are_hidden_from_outside(self):
+        with self.assertLogs("yatube.slow_requests"):
+            response = self.client.get(
+                reverse("metrics"), REMOTE_ADDR="203.0.113.1"
+            )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    EMAIL_BACKEND="core.mail.OutboxEmailBackend",
+    OUTBOX_EMAIL_BACKEND="core.tests.CountingBackend",
+    OUTBOX_BATCH_SIZE=2,
+    BACKGROUND_TASKS_EAGER=True,
+)
+class OutboxTest(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def test_messages_are_sent_in_batches_over_one_connection(self):
+        mail.send_mail(
+            "Тема", "Текст", "from@example.com",
+            [f"user{i}@example.com" for i in range(5)],
+        )
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(),
+            5
+        )
+
+    def test_password_reset_goes_through_outbox(self):
+        User.objects.create_user(
+            username="user", email="user@example.com", password="password"
+        )
+        self.client.post(
+            reverse("users:password_reset_form"),
+            {"email": "user@example.com"},
+        )
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipient, "user@example.com")
+        self.assertEqual(email.status, OutgoingEmail.SENT)
+
+    @override_settings(
+        OUTBOX_EMAIL_BACKEND="core.tests.FailingBackend",
+        OUTBOX_MAX_ATTEMPTS=2,
+        OUTBOX_RETRY_DELAY=60,
+    )
+    def test_failed_message_is_retried_with_backoff(self):
+        started = timezone.now()
+        mail.send_mail("Тема", "Текст", None, ["user@example.com"])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("SMTP недоступен", email.last_error)
+        self.assertGreaterEqual(
+            email.next_attempt_at, started + datetime.timedelta(seconds=60)
+        )
+        self.assertEqual(deliver_outbox(), 0)
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        with self.assertLogs("core.mail", "ERROR"):
+            deliver_outbox()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.FAILED)
+
+
+class SQLitePragmaTest(TestCase):
+    def test_profile_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            # 1 - NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        patcher = mock.patch("core.routers.is_healthy", return_value=True)
+        self.healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, view, **cookies):
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies)
+        return ReplicaPinMiddleware(use_replica(view))(request)
+
+    def test_feed_view_reads_from_replica(self):
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Post))
+            self.router.db_for_write(Post)
+            databases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = self.request(view)
+        self.assertEqual(databases, ["replica", "default"])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+    def test_pinned_or_unhealthy_request_reads_from_primary(self):
+        databases = []
+
+        def view(request):
+            databases.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = self.request(view, **{PIN_COOKIE: "1"})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.healthy.return_value = False
+        self.request(view)
+        self.assertEqual(databases, ["default", "default"])
+
+    def test_fresh_versions_are_stale_only_on_replica_reads(self):
+        fresh = new_version()
+        old = "0" * 32 + f".{int(time.time()) - 60}"
+        legacy = "0" * 32
+        results = []
+
+        def view(request):
+            results.append(may_be_stale(fresh))
+            self.router.db_for_read(Post)
+            results.append(may_be_stale(fresh))
+            results.append(may_be_stale(old, legacy))
+            return HttpResponse()
+
+        self.request(view)
+        self.assertEqual(results, [False, True, False])
+        self.assertFalse(may_be_stale(fresh))
+
+
+class ReplicaHealthTest(TestCase):
+    def test_health_is_checked_once_per_interval(self):
+        self.assertTrue(is_healthy("default"))
+        with self.assertNumQueries(0):
+            self.assertTrue(is_healthy("default"))
+
+
+class QueryRecorderTest(TestCase):
+    def test_queries_of_every_connection_are_recorded(self):
+        with QueryRecorder() as recorder:
+            for alias in connections:
+                self.assertIn(recorder, connections[alias].execute_wrappers)
+            User.objects.count()
+        self.assertEqual(recorder.queries[0]["alias"], "default")
+        self.assertNotIn(recorder, connection.execute_wrappers)
+
+
+class ASGIHandlerTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.group = Group.objects.create(title="Группа", slug="group")
+        self.post = Post.objects.create(
+            text="Пост через ASGI", author=self.author, group=self.group
+        )
+
+    def request(self, path, method="GET", body=b""):
+        messages = [{"type": "http.request", "body": body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": b"",
+            "headers": [(b"host", b"testserver")],
+        }
+        asyncio.run(ASGIHandler()(scope, receive, send))
+        body = b"".join(message.get("body", b"") for message in sent[1:])
+        return sent[0]["status"], body.decode()
+
+    def test_read_views_are_served(self):
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:post_detail", args=[self.post.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                status, body = self.request(url)
+                self.assertEqual(status, 200)
+                self.assertIn("Пост через ASGI", body)
+
+    def test_missing_group_and_head_request(self):
+        status, _ = self.request(reverse("posts:group_list", args=["none"]))
+        self.assertEqual(status, 404)
+        status, body = self.request(reverse("posts:index"), method="HEAD")
+        self.assertEqual((status, body), (200, ""))
+
+
+class StartupTest(SimpleTestCase):
+    def test_import_times_are_grouped_by_app(self):
+        entries = parse([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       150 |        150 |     posts.paginators",
+            "import time:       300 |        450 |   posts.views",
+            "import time:      1000 |       1000 |   PIL.Image",
+            "import time:        20 |         20 | posts",
+        ])
+        self.assertEqual(entries[0], ("posts.paginators", 150, 150))
+        self.assertEqual(
+            aggregate(entries, ["posts", "post"]),
+            {"PIL": (1000, 1), "posts": (470, 3)},
+        )
+
+    def test_admin_urls_are_loaded_on_demand(self):
+        resolver = admin_urls()
+        resolver._populate()
+        self.assertIsNone(resolver.urlconf_name._patterns)
+        self.assertIn("posts_post_changelist", resolver.reverse_dict)
+        self.assertIsNotNone(resolver.urlconf_name._patterns)
+
+    def test_warm_up_compiles_urls_and_templates(self):
+        with self.assertLogs("yatube.startup"):
+            report = warm_up()
+        self.assertGreater(report["urls"], 0)
+        self.assertGreater(report["templates"], 0)
+
+
+class StaticBuildTest(SimpleTestCase):
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        os.mkdir(os.path.join(source.name, "css"))
+        with open(os.path.join(source.name, "css", "site.css"), "w") as css:
+            css.write(
+                "/* шапка */\n.logo {\n  background: url('../img/logo.png');"
+                "\n  content: \"a  b\";\n}\n" * 20
+            )
+        self.root = root.name
+        overrides = override_settings(
+            STATIC_ROOT=root.name, STATIC_BUILD_WORKERS=2,
+            STATICFILES_DIRS=settings.STATICFILES_DIRS + [source.name],
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    def test_files_are_hashed_minified_and_compressed(self):
+        hashed = staticfiles_storage.stored_name("css/site.css")
+        self.assertRegex(hashed, r"^css/site\.[0-9a-f]{12}\.css$")
+        with open(os.path.join(self.root, hashed)) as css:
+            content = css.read()
+        self.assertNotIn("шапка", content)
+        self.assertIn('.logo{background:url("../img/logo.', content)
+        self.assertIn('content:"a  b"}', content)
+        with gzip.open(os.path.join(self.root, hashed + ".gz"), "rt") as gz:
+            self.assertEqual(gz.read(), content)
+        self.assertIn(".gz", staticfiles_storage.built_files[hashed])
+        template = Template("{% load static %}{% static 'css/site.css' %}")
+        self.assertEqual(template.render(Context()), "/static/" + hashed)
+
+    def test_hashed_files_are_cached_forever(self):
+        hashed = staticfiles_storage.stored_name("css/site.css")
+        factory = RequestFactory()
+        response = static_file(
+            factory.get("/", HTTP_ACCEPT_ENCODING="gzip, deflate"), hashed
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertNotIn("Last-Modified", response)
+        response = static_file(factory.get("/"), "css/site.css")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+    def test_minify_css_keeps_strings(self):
+        self.assertEqual(
+            minify_css("a > b ,c { x: 'a ; b' ; } /*! MIT */"),
+            "a>b,c{x:'a ; b'}/*! MIT */",
+        )
@@ -1,4 +1,20 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified
+)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .profiling import metrics as profiling_metrics
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию; 
@@ -7,4 +23,66 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
- 
\ No newline at end of file
+
+
+def metrics(request):
+    # Метрики только для сборщика изнутри сети.
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        profiling_metrics.export(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+# Сжатые копии, которые пишет core.storage, в порядке предпочтения.
+STATIC_ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+
+
+def static_file(request, path):
+    """
+    Файл из STATIC_ROOT для STATIC_SERVE = True.
+
+    Отдаёт готовую копию .br или .gz, если клиент её принимает.
+    Хэшированные имена кэшируются навсегда и не перепроверяются.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    hashed = staticfiles_storage.is_hashed(path)
+    if not hashed and not was_modified_since(
+        request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime,
+        stat.st_size,
+    ):
+        return HttpResponseNotModified()
+    content_type = mimetypes.guess_type(full_path)[0]
+    accepted = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    encoding = None
+    for suffix, name in STATIC_ENCODINGS:
+        if re.search(rf"\b{name}\b", accepted) and os.path.isfile(
+            full_path + suffix
+        ):
+            full_path, encoding = full_path + suffix, name
+            break
+    response = FileResponse(
+        open(full_path, "rb"),
+        content_type=content_type or "application/octet-stream",
+    )
+    if encoding:
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    if hashed:
+        patch_cache_control(
+            response, public=True, immutable=True,
+            max_age=settings.STATIC_MAX_AGE,
+        )
+    else:
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        patch_cache_control(
+            response, public=True, max_age=settings.STATIC_UNHASHED_MAX_AGE,
+        )
+    return response
@@ -0,0 +1,75 @@
+"""
+Прогрев воркера до приёма запросов (вызывается из yatube/wsgi.py).
+
+Первый запрос нового воркера иначе сам компилирует регулярные выражения
+URLconf, читает и разбирает шаблоны и загружает каталоги переводов.
+Здесь это делается заранее: reverse() заполняет словари резолвера,
+get_template() кладёт все шаблоны в кэширующий загрузчик (он включён
+при DEBUG = False), activate() загружает переводы LANGUAGE_CODE.
+Админка не прогревается - она загружается лениво (core.lazy_admin).
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver, reverse
+from django.utils import translation
+
+logger = logging.getLogger("yatube.startup")
+
+# Что открывает большинство посетителей.
+WARMUP_URLS = ("posts:index", "posts:search", "users:login")
+
+
+def warm_urls():
+    resolver = get_resolver()
+    for name in WARMUP_URLS:
+        # Резолв компилирует шаблоны путей по дороге к представлению.
+        resolver.resolve(reverse(name))
+    return len(resolver.reverse_dict)
+
+
+def template_names(engine):
+    for directory in engine.template_dirs:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith((".html", ".txt")):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, directory)
+
+
+def warm_templates():
+    loaded = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                # Чужие шаблоны (например, Jinja2 в каталоге Django).
+                continue
+            loaded += 1
+    return loaded
+
+
+def warm_translations():
+    translation.activate(settings.LANGUAGE_CODE)
+    try:
+        # Первый gettext загружает каталоги всех приложений.
+        translation.gettext("Log in")
+    finally:
+        translation.deactivate()
+
+
+def warm_up():
+    """Прогревает воркер; возвращает отчёт для журнала."""
+    started = time.perf_counter()
+    report = {
+        "urls": warm_urls(),
+        "templates": warm_templates(),
+    }
+    warm_translations()
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("Воркер %s прогрет: %s", os.getpid(), report)
+    return report
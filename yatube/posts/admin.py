@@ -1,6 +1,12 @@
 from django.contrib import admin
+from django.db import models
 
+# ImageField админки открывает картинку через Pillow: нужен тот же
+# предел разрешения, что и в формах постов.
+from . import pil  # noqa: F401
+from .forms import PostImageField
 from .models import Post, Group
+from .search import get_backend as get_search_backend
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +15,19 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
     list_editable = ("group",)
+    # Новые загрузки проверяются так же, как в формах постов.
+    formfield_overrides = {
+        models.ImageField: {"form_class": PostImageField},
+    }
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%term%' по search_fields - полнотекстовый индекс.
+        if not search_term.strip():
+            return queryset, False
+        return (
+            get_search_backend().filter_queryset(queryset, search_term),
+            False,
+        )
 
 
 class GroupAdmin(admin.ModelAdmin):
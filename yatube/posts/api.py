@@ -0,0 +1,196 @@
+"""
+JSON API лент только для чтения.
+
+Строки берутся через values() без создания моделей, выбираются только
+запрошенные ``?fields=`` поля (плюс ключ паджинации). Паджинация по
+курсору, как в HTML-лентах. ETag считается по выбранным значениям строк
+до сериализации: ответ зависит только от них, поэтому ETag меняется и
+при правках мимо сигналов (comments_count меняется через update()). На
+совпавший If-None-Match ответ 304 без кодирования JSON. Страница ленты
+отдаётся потоком, по строке за раз.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from core.queries import query_budget
+from core.routers import use_replica
+
+from .formatting import render_text
+from .models import Group, Post, User
+from .paginators import CursorPaginator
+
+# Поле API -> поле или кортеж полей values(). Связанные таблицы
+# присоединяются, только если их поля запрошены.
+FIELDS = {
+    "id": "id",
+    "text": "text",
+    "text_html": "text_html",
+    "pub_date": "pub_date",
+    "author": "author__username",
+    "author_name": (
+        "author__first_name", "author__last_name", "author__username"
+    ),
+    "group": "group__slug",
+    "group_title": "group__title",
+    "image": "image",
+    "comments_count": "comments_count",
+}
+# Поля, значение которых собирается из строки, а не берётся как есть.
+CONVERTERS = {
+    # Как get_full_name|default:username в шаблонах.
+    "author_name": lambda row: (
+        f"{row['author__first_name']} {row['author__last_name']}".strip()
+        or row["author__username"]
+    ),
+    "image": lambda row: (
+        default_storage.url(row["image"]) if row["image"] else None
+    ),
+}
+DEFAULT_FIELDS = ("id", "text", "pub_date", "author", "group")
+# Нужны всегда: ключ курсора.
+SERVICE_FIELDS = ("id", "pub_date")
+
+encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def parse_fields(request):
+    raw = request.GET.get("fields")
+    if not raw:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in raw.split(",")))
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise BadRequest(f"Неизвестные поля: {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(request):
+    try:
+        limit = int(request.GET.get("limit", settings.API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("limit должен быть числом")
+    if not 1 <= limit <= settings.API_MAX_PAGE_SIZE:
+        raise BadRequest(f"limit от 1 до {settings.API_MAX_PAGE_SIZE}")
+    return limit
+
+
+def select(queryset, fields):
+    paths = set(SERVICE_FIELDS)
+    for name in fields:
+        path = FIELDS[name]
+        paths.update((path,) if isinstance(path, str) else path)
+    if "text_html" in fields:
+        # Строки после bulk_create отрисовываются на лету.
+        paths |= {"text", "text_version"}
+    return queryset.values(*paths)
+
+
+def serialize(row, fields):
+    item = {
+        name: CONVERTERS[name](row) if name in CONVERTERS
+        else row[FIELDS[name]]
+        for name in fields
+    }
+    if "text_html" in item and not row["text_version"]:
+        item["text_html"] = render_text(row["text"])
+    return item
+
+
+def make_etag(request, rows, *extra):
+    # Ключи сортируются: порядок полей values() от процесса не зависит.
+    raw = "\n".join(
+        [request.get_full_path(), *map(str, extra)]
+        + [repr(sorted(row.items())) for row in rows]
+    )
+    return '"{}"'.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional(request, etag, build):
+    """304 на совпавший ETag, иначе ответ build() с заголовками."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def stream_page(page_obj, fields):
+    yield '{"results": ['
+    for number, row in enumerate(page_obj):
+        yield ("," if number else "") + encoder.encode(serialize(row, fields))
+    yield '], "next_cursor": {}, "previous_cursor": {}}}'.format(
+        encoder.encode(page_obj.next_cursor),
+        encoder.encode(page_obj.previous_cursor),
+    )
+
+
+def feed_response(request, posts):
+    try:
+        fields = parse_fields(request)
+        limit = parse_limit(request)
+    except BadRequest as exception:
+        return error(str(exception), 400)
+    page_obj = CursorPaginator(select(posts, fields), limit).get_page(
+        request.GET.get("cursor")
+    )
+    etag = make_etag(
+        request, page_obj.object_list,
+        page_obj.next_cursor, page_obj.previous_cursor,
+    )
+    return conditional(request, etag, lambda: StreamingHttpResponse(
+        stream_page(page_obj, fields), content_type="application/json"
+    ))
+
+
+@use_replica
+@query_budget(3)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@use_replica
+@query_budget(4)
+def group_posts(request, slug):
+    if not Group.objects.filter(slug=slug).exists():
+        return error("Группа не найдена", 404)
+    return feed_response(request, Post.objects.filter(group__slug=slug))
+
+
+@use_replica
+@query_budget(4)
+def profile(request, username):
+    if not User.objects.filter(username=username).exists():
+        return error("Автор не найден", 404)
+    return feed_response(
+        request, Post.objects.filter(author__username=username)
+    )
+
+
+@use_replica
+@query_budget(3)
+def post_detail(request, post_id):
+    try:
+        fields = parse_fields(request)
+    except BadRequest as exception:
+        return error(str(exception), 400)
+    row = select(Post.objects.filter(pk=post_id), fields).first()
+    if row is None:
+        return error("Пост не найден", 404)
+    return conditional(request, make_etag(request, [row]), lambda: (
+        JsonResponse(serialize(row, fields), encoder=DjangoJSONEncoder,
+                     json_dumps_params={"ensure_ascii": False})
+    ))
@@ -0,0 +1,334 @@
+"""
+Нагрузочный прогон лент и страниц постов.
+
+seed() наполняет базу (пользователи и группы через mixer, посты и
+комментарии пакетами bulk_create с текстами Faker), run() гоняет
+запросы через WSGI-приложение в нескольких потоках и собирает задержку,
+число SQL-запросов на запрос и потребление памяти процессом.
+Вызывается командой ``manage.py benchmark``.
+"""
+import datetime
+import random
+import resource
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+)
+from django.core.wsgi import get_wsgi_application
+from django.db import connections, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import counters, formatting
+from .models import Comment, Group, Post, User
+from .ndjson import keep_dates
+from .search import get_backend as get_search_backend
+
+BATCH_SIZE = 5000
+VIEWS = (
+    "index", "group_list", "profile", "post_detail", "post_create",
+    "add_comment",
+)
+WRITE_VIEWS = ("post_create", "add_comment")
+
+
+def seed(users, groups, posts, comments, stdout=None, random_seed=0):
+    """Добавляет в базу пользователей, группы, посты и комментарии."""
+    from faker import Faker
+    from mixer.backend.django import mixer
+
+    fake = Faker("ru_RU")
+    Faker.seed(random_seed)
+    rng = random.Random(random_seed)
+    log = stdout.write if stdout else (lambda message: None)
+
+    with transaction.atomic():
+        suffix = User.objects.count()
+        mixer.cycle(users).blend(
+            User, username=(f"bench{suffix + i}" for i in range(users))
+        )
+        suffix = Group.objects.count()
+        mixer.cycle(groups).blend(
+            Group, slug=(f"bench-{suffix + i}" for i in range(groups))
+        )
+    log(f"Пользователей: {users}, групп: {groups}")
+    user_ids = list(User.objects.values_list("pk", flat=True))
+    group_ids = list(Group.objects.values_list("pk", flat=True)) + [None]
+    sentences = [fake.paragraph(nb_sentences=3) for _ in range(1000)]
+    start = timezone.now() - datetime.timedelta(days=365)
+
+    for offset in range(0, posts, BATCH_SIZE):
+        size = min(BATCH_SIZE, posts - offset)
+        # Иначе auto_now_add перезапишет даты и разброса по году не будет.
+        with keep_dates(Post._meta.get_field("pub_date")):
+            Post.objects.bulk_create(
+                Post(
+                    text=rng.choice(sentences),
+                    author_id=rng.choice(user_ids),
+                    group_id=rng.choice(group_ids),
+                    pub_date=start + datetime.timedelta(
+                        seconds=rng.randrange(365 * 24 * 3600)
+                    ),
+                )
+                for _ in range(size)
+            )
+        log(f"Постов: {offset + size}/{posts}")
+    post_ids = list(Post.objects.values_list("pk", flat=True))
+    for offset in range(0, comments, BATCH_SIZE):
+        size = min(BATCH_SIZE, comments - offset)
+        Comment.objects.bulk_create(
+            Comment(
+                text=rng.choice(sentences),
+                author_id=rng.choice(user_ids),
+                post_id=rng.choice(post_ids),
+            )
+            for _ in range(size)
+        )
+        log(f"Комментариев: {offset + size}/{comments}")
+
+    # bulk_create обходит сигналы: счётчики, поиск и HTML чиним целиком.
+    with transaction.atomic():
+        counters.recount()
+    get_search_backend().rebuild()
+    formatting.rerender_all()
+
+
+class Sample:
+    """Данные, из которых строятся URL и тела запросов."""
+
+    def __init__(self, size=1000, random_seed=0):
+        self.rng = random.Random(random_seed)
+        self.lock = threading.Lock()
+        self.usernames = list(
+            User.objects.order_by("?").values_list("username", flat=True)
+            [:size]
+        )
+        self.slugs = list(
+            Group.objects.order_by("?").values_list("slug", flat=True)[:size]
+        )
+        self.post_ids = list(
+            Post.objects.order_by("?").values_list("pk", flat=True)[:size]
+        )
+        if not (self.usernames and self.slugs and self.post_ids):
+            raise ValueError("В базе нет данных: сначала запустите --seed")
+
+    def choice(self, values):
+        with self.lock:
+            return self.rng.choice(values)
+
+    def request(self, view):
+        """(метод, путь, тело POST) для одного запроса к view."""
+        if view == "index":
+            return "GET", reverse("posts:index"), None
+        if view == "group_list":
+            slug = self.choice(self.slugs)
+            return "GET", reverse("posts:group_list", args=[slug]), None
+        if view == "profile":
+            username = self.choice(self.usernames)
+            return "GET", reverse("posts:profile", args=[username]), None
+        if view == "post_detail":
+            post_id = self.choice(self.post_ids)
+            return "GET", reverse("posts:post_detail", args=[post_id]), None
+        if view == "post_create":
+            return "POST", reverse("posts:post_create"), {
+                "text": "Пост из нагрузочного теста",
+            }
+        if view == "add_comment":
+            post_id = self.choice(self.post_ids)
+            return "POST", reverse("posts:add_comment", args=[post_id]), {
+                "text": "Комментарий из нагрузочного теста",
+            }
+        raise ValueError(f"Неизвестная страница: {view}")
+
+
+def login_cookie(user):
+    """Cookie сессии вошедшего пользователя и CSRF-токен к ней."""
+    from importlib import import_module
+
+    from django.middleware.csrf import _get_new_csrf_token
+
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    token = _get_new_csrf_token()
+    cookie = SimpleCookie()
+    cookie[settings.SESSION_COOKIE_NAME] = session.session_key
+    cookie[settings.CSRF_COOKIE_NAME] = token
+    header = "; ".join(
+        f"{morsel.key}={morsel.value}" for morsel in cookie.values()
+    )
+    return header, token
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return None
+    rank = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def current_rss():
+    """Текущий RSS процесса в байтах (Linux) или None."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * resource.getpagesize()
+
+
+def peak_rss():
+    # В Linux ru_maxrss в килобайтах.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Runner:
+    def __init__(self, sample, user=None):
+        self.application = get_wsgi_application()
+        self.sample = sample
+        self.cookie = self.token = None
+        if user is not None:
+            self.cookie, self.token = login_cookie(user)
+
+    def environ(self, method, path, data):
+        body = urlencode(data or {}).encode()
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "testserver",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": BytesIO(body),
+            "wsgi.errors": BytesIO(),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "CONTENT_TYPE": "application/x-www-form-urlencoded",
+            "CONTENT_LENGTH": str(len(body)),
+        }
+        if self.cookie:
+            environ["HTTP_COOKIE"] = self.cookie
+            environ["HTTP_X_CSRFTOKEN"] = self.token
+        return environ
+
+    def call(self, view):
+        """Один запрос: (секунды, число SQL-запросов, статус)."""
+        method, path, data = self.sample.request(view)
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        status = []
+        # Считаем запросы и к репликам: ленты читаются с них.
+        with ExitStack() as wrappers:
+            for target in connections.all():
+                wrappers.enter_context(target.execute_wrapper(count))
+            started = time.perf_counter()
+            response = self.application(
+                self.environ(method, path, data),
+                lambda code, headers, exc_info=None: status.append(code),
+            )
+            for _ in response:
+                pass
+            elapsed = time.perf_counter() - started
+        if hasattr(response, "close"):
+            response.close()
+        return elapsed, len(queries), int(status[0].split()[0])
+
+    def run(self, view, requests, concurrency):
+        def worker(count):
+            try:
+                return [self.call(view) for _ in range(count)]
+            finally:
+                connections.close_all()
+
+        per_worker = [requests // concurrency] * concurrency
+        for i in range(requests % concurrency):
+            per_worker[i] += 1
+        rss_before = current_rss()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = [
+                row
+                for rows in pool.map(worker, [n for n in per_worker if n])
+                for row in rows
+            ]
+        wall = time.perf_counter() - started
+        latencies = sorted(elapsed for elapsed, _, _ in results)
+        query_counts = [count for _, count, _ in results]
+        statuses = {}
+        for _, _, code in results:
+            statuses[str(code)] = statuses.get(str(code), 0) + 1
+        return {
+            "requests": len(results),
+            "concurrency": concurrency,
+            "throughput_rps": len(results) / wall if wall else None,
+            "latency_ms": {
+                name: percentile(latencies, fraction) * 1000
+                for name, fraction in (
+                    ("p50", 0.5), ("p95", 0.95), ("p99", 0.99)
+                )
+            },
+            "queries_per_request": {
+                "mean": sum(query_counts) / len(query_counts),
+                "max": max(query_counts),
+            },
+            "statuses": statuses,
+            "rss_bytes": {
+                "before": rss_before,
+                "after": current_rss(),
+                "peak": peak_rss(),
+            },
+        }
+
+
+@contextmanager
+def isolated_cache():
+    """
+    Кэш по умолчанию со своим KEY_PREFIX: прогон начинается с холодного
+    кэша и не трогает страницы, карточки и миниатюры работающего сайта.
+    """
+    default = settings.CACHES["default"]
+    prefix = f"benchmark-{uuid.uuid4().hex}"
+    if default.get("KEY_PREFIX"):
+        prefix = f"{default['KEY_PREFIX']}:{prefix}"
+    caches = dict(settings.CACHES, default=dict(default, KEY_PREFIX=prefix))
+    with override_settings(CACHES=caches):
+        yield
+
+
+def run(views, requests, concurrency, user, anonymous_reads=True):
+    """
+    Прогоняет views. Запись идёт от имени user, чтение - анонимно
+    (через кэш страниц) или тоже от его имени.
+    """
+    with isolated_cache():
+        sample = Sample()
+        writer = Runner(sample, user=user)
+        reader = Runner(sample) if anonymous_reads else writer
+        return {
+            view: (writer if view in WRITE_VIEWS else reader).run(
+                view, requests, concurrency
+            )
+            for view in views
+        }
@@ -0,0 +1,91 @@
+"""
+Кэш отрисованных карточек постов (``includes/post.html``).
+
+Ключ карточки содержит версии поста, автора и группы. Сигналы меняют
+версию при сохранении или удалении объекта, поэтому старые карточки
+просто перестают запрашиваться и вытесняются кэшем сами.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from core.routers import may_be_stale, new_version
+
+CARD_TEMPLATE = "includes/post.html"
+
+
+def _version_key(kind, pk):
+    return f"post_card:v:{kind}:{pk}"
+
+
+def bump_version(kind, pk):
+    """Инвалидирует все карточки, зависящие от объекта kind/pk."""
+    cache.set(_version_key(kind, pk), new_version(), None)
+
+
+def bump_versions(kind, pks):
+    """То же для многих объектов одним обращением к кэшу."""
+    cache.set_many(
+        {_version_key(kind, pk): new_version() for pk in pks}, None
+    )
+
+
+def _get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        # Версия вытеснена из кэша - выдаём новую, чтобы не отдать
+        # карточку, отрисованную до последнего изменения.
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def render_cards(posts, profile=False, group=False, using=None):
+    """
+    Возвращает HTML карточек постов, отрисовывая только промахи.
+    using - движок шаблонов (у Jinja2 своя includes/post.html).
+    """
+    posts = list(posts)
+    dependencies = {
+        post.pk: (
+            _version_key("post", post.pk),
+            _version_key("user", post.author_id),
+            _version_key("group", post.group_id),
+        )
+        for post in posts
+    }
+    versions = _get_versions(
+        {key for keys in dependencies.values() for key in keys}
+    )
+    variant = "{}:{}:{}{}".format(
+        using or "django", get_language(), int(bool(profile)),
+        int(bool(group)),
+    )
+    card_keys = {
+        post.pk: "post_card:{}:{}:{}".format(
+            post.pk, variant,
+            ":".join(versions[key] for key in dependencies[post.pk]),
+        )
+        for post in posts
+    }
+    cached = cache.get_many(card_keys.values())
+    rendered = {}
+    for post in posts:
+        key = card_keys[post.pk]
+        if key not in cached:
+            cached[key] = render_to_string(
+                CARD_TEMPLATE,
+                {"post": post, "profile": profile, "group": group},
+                using=using,
+            )
+            # Пост мог прийти с реплики, ещё не видевшей изменения.
+            if not may_be_stale(
+                *(versions[name] for name in dependencies[post.pk])
+            ):
+                rendered[key] = cached[key]
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    return [mark_safe(cached[card_keys[post.pk]]) for post in posts]
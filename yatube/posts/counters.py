@@ -0,0 +1,93 @@
+"""
+Денормализованные счётчики: постов и подписчиков автора, постов группы,
+комментариев поста.
+
+Счётчики меняются F-выражениями в сигналах (см. posts.signals) в той же
+транзакции, что и сама запись. Расхождения чинит ``manage.py recount``.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorCounter, Comment, Follow, Group, Post, User
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        # При расхождении счётчик не уходит в минус (CHECK >= 0).
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _change_author(author_id, field, delta):
+    counter = AuthorCounter.objects.filter(author_id=author_id)
+    if not _change(counter, field, delta) and delta > 0:
+        _, created = AuthorCounter.objects.get_or_create(
+            author_id=author_id, defaults={field: delta}
+        )
+        if not created:
+            _change(counter, field, delta)
+
+
+def change_author_posts(author_id, delta):
+    _change_author(author_id, "posts_count", delta)
+
+
+def change_author_followers(author_id, delta):
+    _change_author(author_id, "followers_count", delta)
+
+
+def get_followers_count(author_id):
+    return (
+        AuthorCounter.objects.filter(author_id=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    ) or 0
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), "posts_count", delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), "comments_count", delta)
+
+
+def _count_of(queryset, field):
+    """Подзапрос COUNT(*) по field = OuterRef("pk"), 0 если строк нет."""
+    subquery = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики с нуля, возвращает число исправлений."""
+    fixed = 0
+    AuthorCounter.objects.bulk_create(
+        [
+            AuthorCounter(author_id=pk)
+            for pk in User.objects.filter(post_counter__isnull=True)
+            .values_list("pk", flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    for model, field, counted in (
+        (AuthorCounter, "posts_count",
+         _count_of(Post.objects.all(), "author")),
+        (AuthorCounter, "followers_count",
+         _count_of(Follow.objects.all(), "author")),
+        (Group, "posts_count", _count_of(Post.objects.all(), "group")),
+        (Post, "comments_count", _count_of(Comment.objects.all(), "post")),
+    ):
+        queryset = model.objects.annotate(actual=counted).exclude(
+            **{field: F("actual")}
+        )
+        for pk, actual in queryset.values_list("pk", "actual").iterator():
+            model.objects.filter(pk=pk).update(**{field: actual})
+            fixed += 1
+    return fixed
@@ -0,0 +1,61 @@
+"""
+Заранее отрисованный текст постов и комментариев.
+
+HTML текста (linebreaks с экранированием) и заголовок поста считаются
+один раз при сохранении (сигнал pre_save) и хранятся в модели вместе с
+TEXT_FORMAT_VERSION. После изменения форматирования версию нужно
+увеличить и запустить ``manage.py rerender_texts``: устаревшие строки
+перерисуются пачками, пока сайт работает. Строки с версией 0 (записаны
+через bulk_create) шаблоны отрисовывают на лету.
+"""
+from django.db.models import Q
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+from .cards import bump_versions
+from .models import Comment, Post
+
+TEXT_FORMAT_VERSION = 1
+TITLE_LENGTH = 30
+
+
+def render_text(text):
+    return linebreaks(text, autoescape=True)
+
+
+def render(instance):
+    """Заполняет отрисованные поля поста или комментария."""
+    instance.text_html = render_text(instance.text)
+    if isinstance(instance, Post):
+        instance.text_title = Truncator(instance.text).chars(TITLE_LENGTH)
+    instance.text_version = TEXT_FORMAT_VERSION
+
+
+def rerender_stale(model, batch_size=1000):
+    """Перерисовывает строки model с устаревшей версией; возвращает число."""
+    fields = ["text_html", "text_version"]
+    if model is Post:
+        fields.append("text_title")
+    stale = model.objects.filter(
+        ~Q(text_version=TEXT_FORMAT_VERSION)
+    ).order_by("pk").only("pk", "text")
+    done, last_pk = 0, 0
+    while True:
+        batch = list(stale.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return done
+        for instance in batch:
+            render(instance)
+        model.objects.bulk_update(batch, fields)
+        if model is Post:
+            # bulk_update обходит сигналы: карточки сбрасываем сами.
+            bump_versions("post", [post.pk for post in batch])
+        done += len(batch)
+        last_pk = batch[-1].pk
+
+
+def rerender_all(batch_size=1000):
+    return {
+        "posts": rerender_stale(Post, batch_size),
+        "comments": rerender_stale(Comment, batch_size),
+    }
@@ -1,12 +1,27 @@
 from django import forms
 
 from .models import Post, Comment
+from .uploads import load_pillow, validate_post_image
+
+
+class PostImageField(forms.ImageField):
+    """ImageField, который не декодирует картинку, а читает заголовок."""
+
+    def to_python(self, data):
+        file = forms.FileField.to_python(self, data)
+        if file is None:
+            return None
+        file.content_type = load_pillow().MIME.get(validate_post_image(file))
+        return file
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('group', 'text', 'image')
+        field_classes = {
+            'image': PostImageField,
+        }
 
         labels = {
             'text': 'Текст',
@@ -0,0 +1,98 @@
+import json
+import platform
+import sys
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts import benchmark
+from posts.models import Comment, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон страниц постов через WSGI: задержка "
+        "p50/p95/p99, SQL-запросы на запрос и RSS. С --seed сначала "
+        "наполняет базу. Запускайте на отдельной базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed", action="store_true",
+            help="Сначала добавить данные (--users, --groups, --posts).",
+        )
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--groups", type=int, default=100)
+        parser.add_argument("--posts", type=int, default=1000000)
+        parser.add_argument("--comments", type=int, default=100000)
+        parser.add_argument(
+            "--views", nargs="+", choices=benchmark.VIEWS,
+            default=list(benchmark.VIEWS),
+        )
+        parser.add_argument(
+            "--requests", type=int, default=500,
+            help="Запросов к каждой странице.",
+        )
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--authenticated-reads", action="store_true",
+            help="Читать ленты от имени пользователя, мимо кэша страниц.",
+        )
+        parser.add_argument(
+            "--output", default="benchmark.json",
+            help="Куда записать результаты в JSON.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            benchmark.seed(
+                options["users"], options["groups"], options["posts"],
+                options["comments"], stdout=self.stdout,
+            )
+        user, _ = User.objects.get_or_create(username="benchmark")
+        try:
+            views = benchmark.run(
+                options["views"], options["requests"],
+                options["concurrency"], user,
+                anonymous_reads=not options["authenticated_reads"],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        report = {
+            "started": timezone.now().isoformat(),
+            "environment": {
+                "python": sys.version.split()[0],
+                "django": django.get_version(),
+                "platform": platform.platform(),
+                "database": settings.DATABASES["default"]["ENGINE"],
+                "cache": settings.CACHES["default"]["BACKEND"],
+            },
+            "dataset": {
+                "users": User.objects.count(),
+                "groups": Group.objects.count(),
+                "posts": Post.objects.count(),
+                "comments": Comment.objects.count(),
+            },
+            "options": {
+                name: options[name]
+                for name in (
+                    "requests", "concurrency", "authenticated_reads"
+                )
+            },
+            "views": views,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        for view, result in views.items():
+            latency = result["latency_ms"]
+            self.stdout.write(
+                f"{view:12} p50 {latency['p50']:7.1f} мс  "
+                f"p95 {latency['p95']:7.1f} мс  "
+                f"p99 {latency['p99']:7.1f} мс  "
+                f"SQL {result['queries_per_request']['mean']:5.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Результаты записаны в {options['output']}"
+        ))
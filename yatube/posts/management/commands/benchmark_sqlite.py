@@ -0,0 +1,192 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+FEED_SQL = (
+    "SELECT p.id, p.text, p.pub_date, u.username, g.title "
+    "FROM posts_post p INNER JOIN auth_user u ON u.id = p.author_id "
+    "LEFT JOIN posts_group g ON g.id = p.group_id "
+    "ORDER BY p.pub_date DESC, p.id DESC LIMIT 11"
+)
+DETAIL_SQL = "SELECT id, text, comments_count FROM posts_post WHERE id = ?"
+
+
+def connect(path, pragmas):
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    for name, value in pragmas.items():
+        db.execute(f"PRAGMA {name} = {value}")
+    return db
+
+
+def write_comments(path, pragmas, post, hold, start, stop, results):
+    """Процесс-писатель: транзакции как у add_comment."""
+    post_id, author_id = post
+    db = connect(path, pragmas)
+    durations, failed = [], 0
+    start.wait()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT INTO posts_comment (text, created, author_id, "
+                "post_id) VALUES ('Нагрузка', datetime('now'), ?, ?)",
+                [author_id, post_id],
+            )
+            db.execute(
+                "UPDATE posts_post SET comments_count = comments_count + 1 "
+                "WHERE id = ?", [post_id],
+            )
+            # Работа приложения внутри транзакции.
+            time.sleep(hold)
+            db.execute("COMMIT")
+        except sqlite3.OperationalError:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            failed += 1
+            continue
+        durations.append(time.perf_counter() - started)
+    db.close()
+    results.put(("write", durations, failed))
+
+
+def read_feed(path, pragmas, post, hold, start, stop, results):
+    """Процесс-читатель: лента главной и страница поста."""
+    db = connect(path, pragmas)
+    durations, failed = [], 0
+    start.wait()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            db.execute(FEED_SQL).fetchall()
+            db.execute(DETAIL_SQL, [post[0]]).fetchall()
+        except sqlite3.OperationalError:
+            failed += 1
+            continue
+        durations.append(time.perf_counter() - started)
+    db.close()
+    results.put(("read", durations, failed))
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает профили SQLITE_PROFILES под конкурентной записью: "
+        "писатели добавляют комментарии как add_comment, читатели "
+        "читают ленту и пост. Работает на копии базы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument(
+            "--seconds", type=float, default=5,
+            help="Длительность прогона каждого профиля.",
+        )
+        parser.add_argument(
+            "--hold-ms", type=float, default=5,
+            help="Сколько писатель держит транзакцию открытой.",
+        )
+        parser.add_argument("--output", help="Куда записать JSON.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Команда только для SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id, author_id FROM posts_post LIMIT 1")
+            row = cursor.fetchone()
+        if row is None:
+            raise CommandError(
+                "В базе нет постов: manage.py benchmark --seed --posts N"
+            )
+        report = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, profile in settings.SQLITE_PROFILES.items():
+                path = os.path.join(directory, f"{name}.sqlite3")
+                self.copy_database(path)
+                report[name] = self.run_profile(
+                    path, profile["pragmas"], row, options
+                )
+                self.stdout.write(self.format(name, report[name]))
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+
+    def copy_database(self, path):
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        with target:
+            connection.connection.backup(target)
+        # Копия начинает с журнала по умолчанию, профиль включит свой.
+        target.execute("PRAGMA journal_mode = DELETE")
+        target.close()
+
+    def run_profile(self, path, pragmas, post, options):
+        connect(path, pragmas).close()
+        context = multiprocessing.get_context("spawn")
+        count = options["writers"] + options["readers"]
+        # Замер начинается, когда все процессы запущены и подключены.
+        start = context.Barrier(count + 1)
+        stop, results = context.Event(), context.Queue()
+        args = (
+            path, pragmas, post, options["hold_ms"] / 1000,
+            start, stop, results,
+        )
+        workers = [
+            context.Process(target=write_comments, args=args)
+            for _ in range(options["writers"])
+        ] + [
+            context.Process(target=read_feed, args=args)
+            for _ in range(options["readers"])
+        ]
+        for worker in workers:
+            worker.start()
+        start.wait()
+        time.sleep(options["seconds"])
+        stop.set()
+        timings = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        for _ in workers:
+            kind, durations, failed = results.get(
+                timeout=options["seconds"] + 30
+            )
+            timings[kind] += durations
+            errors[kind] += failed
+        for worker in workers:
+            worker.join()
+        return {
+            "pragmas": pragmas,
+            "reads_per_second": len(timings["read"]) / options["seconds"],
+            "writes_per_second": len(timings["write"]) / options["seconds"],
+            "read_latency_ms": self.percentiles(timings["read"]),
+            "write_latency_ms": self.percentiles(timings["write"]),
+            "errors": errors,
+        }
+
+    @staticmethod
+    def percentiles(values):
+        # Модуль импортируется и в процессах нагрузки, где Django не поднят.
+        from posts.benchmark import percentile
+
+        values = sorted(values)
+        return {
+            name: (percentile(values, fraction) or 0) * 1000
+            for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        }
+
+    @staticmethod
+    def format(name, result):
+        reads = result["read_latency_ms"]
+        return (
+            f"{name:8} чтение p50 {reads['p50']:6.2f} мс "
+            f"p99 {reads['p99']:7.2f} мс, "
+            f"{result['reads_per_second']:7.0f} чтений/с, "
+            f"{result['writes_per_second']:5.0f} записей/с, "
+            f"ошибок {result['errors']}"
+        )
@@ -0,0 +1,90 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts.benchmark import percentile
+from posts.cards import CARD_TEMPLATE
+from posts.models import Post
+from posts.paginators import paginate
+from posts.views import POST_COUNT
+
+ENGINES = ("django", "jinja2")
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает скорость отрисовки ленты Django-шаблонами и Jinja2 "
+        "на одном контексте: страница целиком (карточки из кэша) и "
+        "карточки постов без кэша."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=500,
+            help="Сколько раз отрисовать каждый шаблон.",
+        )
+        parser.add_argument("--output", help="Куда записать JSON.")
+
+    def handle(self, *args, **options):
+        if not settings.JINJA2_AVAILABLE:
+            raise CommandError("Jinja2 не установлен: pip install Jinja2")
+        request = RequestFactory().get(reverse("posts:index"))
+        request.user = AnonymousUser()
+        request.resolver_match = resolve(request.path)
+        page_obj = paginate(request, Post.objects.feed(), POST_COUNT)
+        # Строки выбираются один раз, замер - только отрисовка.
+        page_obj.object_list = list(page_obj.object_list)
+        if not page_obj.object_list:
+            raise CommandError(
+                "В базе нет постов: manage.py benchmark --seed --posts N"
+            )
+        report = {}
+        for engine in ENGINES:
+            page = get_template("posts/index.html", using=engine)
+            card = get_template(CARD_TEMPLATE, using=engine)
+            # Первый проход прогревает кэш карточек и загрузчик шаблонов.
+            page.render({"page_obj": page_obj}, request)
+            report[engine] = {
+                "page_ms": self.measure(
+                    lambda: page.render({"page_obj": page_obj}, request),
+                    options["repeat"],
+                ),
+                "cards_ms": self.measure(
+                    lambda: [
+                        card.render({"post": post})
+                        for post in page_obj.object_list
+                    ],
+                    options["repeat"],
+                ),
+            }
+            self.stdout.write(self.format(engine, report[engine]))
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2)
+
+    @staticmethod
+    def measure(render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            "p50": percentile(timings, 0.5),
+            "p95": percentile(timings, 0.95),
+            "mean": sum(timings) / len(timings),
+        }
+
+    @staticmethod
+    def format(engine, result):
+        return (
+            f"{engine:7} страница p50 {result['page_ms']['p50']:6.3f} мс, "
+            f"карточки без кэша p50 {result['cards_ms']['p50']:6.3f} мс"
+        )
@@ -0,0 +1,80 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Comment, Post, TimelineEntry
+from posts.paginators import CursorPaginator
+from posts.views import POST_COUNT
+
+# Признаки плохого плана: полный просмотр таблицы или сортировка
+# во временном B-дереве (SQLite), Seq Scan/Sort (PostgreSQL).
+BAD_PLAN_PATTERNS = {
+    "sqlite": (
+        re.compile(r"\bSCAN (TABLE )?\w+$"),
+        re.compile(r"USE TEMP B-TREE"),
+    ),
+    "postgresql": (
+        re.compile(r"Seq Scan"),
+        re.compile(r"^\s*(->\s*)?Sort\b"),
+    ),
+}
+
+
+def hot_queries():
+    """Запросы, которые выполняют представления лент на каждый хит."""
+    key = [timezone.now(), 1]
+    feeds = {
+        "index": Post.objects.feed(),
+        "group_posts": Post.objects.feed().filter(group_id=1),
+        "profile": Post.objects.feed().filter(author_id=1),
+    }
+    for name, queryset in feeds.items():
+        paginator = CursorPaginator(queryset, POST_COUNT)
+        yield f"{name} (первая страница)", paginator.get_queryset()
+        yield f"{name} (по курсору)", paginator.get_queryset(key=key)
+    timeline = CursorPaginator(
+        TimelineEntry.objects.filter(user_id=1).select_related(
+            "post__author", "post__group"
+        ),
+        POST_COUNT,
+        ordering=("-pub_date", "-post_id"),
+    )
+    yield "follow_index (первая страница)", timeline.get_queryset()
+    yield "follow_index (по курсору)", timeline.get_queryset(key=key)
+    yield "post_detail (комментарии)", Comment.objects.select_related(
+        "author"
+    ).filter(post_id=1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Выводит EXPLAIN QUERY PLAN для запросов лент и завершается с "
+        "ошибкой, если какой-то из них просматривает всю таблицу "
+        "или сортирует во временном B-дереве."
+    )
+
+    def handle(self, *args, **options):
+        patterns = BAD_PLAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(
+                f"Проверка планов не поддерживается для {connection.vendor}"
+            )
+        failed = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            bad = [
+                line for line in plan.splitlines()
+                if any(pattern.search(line) for pattern in patterns)
+            ]
+            style = self.style.ERROR if bad else self.style.SUCCESS
+            self.stdout.write(style(name))
+            self.stdout.write(plan)
+            if bad:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                "Неэффективные планы запросов: " + ", ".join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS("Все планы используют индексы"))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.ndjson import export_posts
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает группы, авторов, посты и комментарии в NDJSON "
+        "потоком, не загружая таблицы в память."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="-",
+            help="Файл для записи (по умолчанию - stdout).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--with-credentials", action="store_true",
+            help="Выгрузить хэши паролей и email (полный переезд).",
+        )
+
+    def handle(self, *args, **options):
+        arguments = (options["chunk_size"], options["with_credentials"])
+        if options["output"] == "-":
+            exported = export_posts(sys.stdout, *arguments)
+        else:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                exported = export_posts(output, *arguments)
+        self.stderr.write(f"Выгружено: {exported}")
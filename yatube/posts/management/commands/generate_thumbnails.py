@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.tasks import init_process
+from posts.thumbnails import generate_thumbnails
+
+
+def walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield f"{path}/{name}"
+    for directory in directories:
+        yield from walk(storage, f"{path}/{directory}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит миниатюры POST_THUMBNAILS для всех картинок в "
+        "MEDIA_ROOT/posts/ параллельно в нескольких процессах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Число процессов (по умолчанию - число ядер).",
+        )
+
+    def handle(self, *args, **options):
+        if not default_storage.exists("posts"):
+            self.stdout.write("Картинок нет")
+            return
+        names = list(walk(default_storage, "posts"))
+        done = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_process,
+        ) as pool:
+            futures = {
+                pool.submit(generate_thumbnails, name): name
+                for name in names
+            }
+            for future, name in futures.items():
+                try:
+                    future.result()
+                    done += 1
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Миниатюры готовы: {done}, ошибок: {failed}"
+        ))
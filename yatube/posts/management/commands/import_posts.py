@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.ndjson import import_posts
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает NDJSON из export_posts пачками bulk_create. Группы и "
+        "пользователи сопоставляются по slug и username, даты "
+        "публикации сохраняются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Файл NDJSON или - для stdin.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            if options["input"] == "-":
+                imported = import_posts(sys.stdin, options["batch_size"])
+            else:
+                with open(options["input"], encoding="utf-8") as lines:
+                    imported = import_posts(lines, options["batch_size"])
+        except (KeyError, ValueError) as error:
+            raise CommandError(f"Ошибка в данных: {error}")
+        self.stdout.write(self.style.SUCCESS(f"Загружено: {imported}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики постов авторов и групп и комментариев "
+        "постов по фактическим данным."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount()
+        self.stdout.write(self.style.SUCCESS(f"Исправлено счётчиков: {fixed}"))
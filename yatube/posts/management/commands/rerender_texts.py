@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.formatting import TEXT_FORMAT_VERSION, rerender_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Перерисовывает HTML постов и комментариев, сохранённый с другой "
+        "версией форматирования (после bulk_create или смены формата)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        done = rerender_all(options["batch_size"])
+        self.stdout.write(
+            f"Версия {TEXT_FORMAT_VERSION}: перерисовано {done}"
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_auto_20230221_0640'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(help_text='Введите текст от 3-х до 140 символов', max_length=140, verbose_name='Текст комментария')),
+                ('created', models.DateTimeField(auto_now_add=True, help_text='Завполняется автоматически', verbose_name='Время комментария')),
+                ('author', models.ForeignKey(help_text='Кто автор этого комментария', on_delete=django.db.models.deletion.CASCADE, related_name='comments', to=settings.AUTH_USER_MODEL, verbose_name='Автор комментария')),
+                ('post', models.ForeignKey(help_text='Для какого поста этот комментарий', on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='posts.Post', verbose_name='Комментарий к посту')),
+            ],
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorCounter = apps.get_model('posts', 'AuthorCounter')
+    per_author = (
+        Post.objects.order_by().values('author').annotate(c=models.Count('pk'))
+    )
+    AuthorCounter.objects.bulk_create(
+        AuthorCounter(author_id=row['author'], posts_count=row['c'])
+        for row in per_author
+    )
+    per_group = (
+        Post.objects.filter(group__isnull=False).order_by()
+        .values('group').annotate(c=models.Count('pk'))
+    )
+    for row in per_group:
+        Group.objects.filter(pk=row['group']).update(posts_count=row['c'])
+    per_post = (
+        apps.get_model('posts', 'Comment').objects.order_by()
+        .values('post').annotate(c=models.Count('pk'))
+    )
+    for row in per_post:
+        Post.objects.filter(pk=row['post']).update(comments_count=row['c'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0008_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorCounter',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
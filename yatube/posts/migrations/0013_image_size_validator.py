@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:45
+
+from django.db import migrations, models
+import posts.uploads
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_rendered_text'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='posts/', validators=[posts.uploads.validate_image_size], verbose_name='Картинка'),
+        ),
+    ]
@@ -9,11 +9,25 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField("адрес", unique=True)
     description = models.TextField("описание")
+    posts_count = models.PositiveIntegerField("число постов", default=0)
 
     def __str__(self) -> str:
         return str(self.title)
 
 
+class PostQuerySet(models.QuerySet):
+    # Поля, которые нужны карточке поста (includes/post.html).
+    FEED_FIELDS = (
+        'text', 'text_html', 'text_version', 'pub_date', 'author', 'group',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__title', 'group__slug',
+    )
+
+    def feed(self):
+        """Посты для лент: автор и группа одним запросом, без лишних полей."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -42,7 +56,19 @@ class Post(models.Model):
         'Картинка',
         upload_to='posts/',
         blank=True
-    )  
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0
+    )
+    # Отрисованный текст (см. posts.formatting), заполняется при сохранении.
+    text_html = models.TextField(editable=False, blank=True)
+    text_title = models.CharField(max_length=30, editable=False, blank=True)
+    text_version = models.PositiveSmallIntegerField(
+        editable=False, default=0
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.text[:15]
@@ -50,10 +76,29 @@ class Post(models.Model):
     def __eq__(self, other) -> bool:
         return self.id == other.id
 
+    # __eq__ без __hash__ делает пост нехэшируемым, и delete() падает.
+    __hash__ = models.Model.__hash__
+
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы под ленты: главная, группа и профиль сортируются
+        # по (pub_date, id), id нужен для курсорной паджинации.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -80,4 +125,109 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Время комментария',
         help_text='Завполняется автоматически'
-    )
\ No newline at end of file
+    )
+    text_html = models.TextField(editable=False, blank=True)
+    text_version = models.PositiveSmallIntegerField(
+        editable=False, default=0
+    )
+
+    class Meta:
+        ordering = ["created"]
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
+
+class AuthorCounter(models.Model):
+    """Счётчик постов автора: модель пользователя менять нельзя."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_counter',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+
+    def __str__(self) -> str:
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в заранее собранной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    # Копии полей поста: сортировка и отписка без JOIN.
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
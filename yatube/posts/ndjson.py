@@ -0,0 +1,200 @@
+"""
+Перенос постов между базами потоком NDJSON.
+
+Строка файла - один объект: {"model": "group" | "user" | "post" |
+"comment", "id": ..., ...поля}. Экспорт идёт в порядке групп, авторов,
+постов и комментариев и читает базу итератором, не загружая таблицы
+целиком. Импорт пишет пачками bulk_create, каждая пачка в своей
+транзакции. Группы и пользователи сопоставляются по slug и username
+(словари старый id -> новый id в памяти), новые id постов - старые плюс
+сдвиг, поэтому на десятки миллионов строк словарь не нужен.
+
+Хэши паролей и email выгружаются только с with_credentials=True (полный
+переезд): без них дамп не раскрывает учётные данные. Пользователи без
+хэша в файле получают непригодный пароль.
+"""
+import json
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import counters, formatting
+from .models import Comment, Group, Post, User
+from .search import get_backend as get_search_backend
+
+GROUP_FIELDS = ("id", "title", "slug", "description")
+USER_FIELDS = ("id", "username", "first_name", "last_name", "date_joined")
+CREDENTIAL_FIELDS = ("email", "password")
+POST_FIELDS = ("id", "text", "pub_date", "author_id", "group_id", "image")
+COMMENT_FIELDS = ("id", "text", "created", "author_id", "post_id")
+
+
+def _dump(model, row):
+    for key, value in row.items():
+        if hasattr(value, "isoformat"):
+            row[key] = value.isoformat()
+    return json.dumps({"model": model, **row}, ensure_ascii=False) + "\n"
+
+
+def export_posts(output, chunk_size=2000, with_credentials=False):
+    """Пишет все данные в output; возвращает {модель: число строк}."""
+    user_fields = USER_FIELDS
+    if with_credentials:
+        user_fields += CREDENTIAL_FIELDS
+    authors = User.objects.filter(pk__in=Post.objects.values("author")) | (
+        User.objects.filter(pk__in=Comment.objects.values("author"))
+    )
+    querysets = (
+        ("group", Group.objects.order_by("pk").values(*GROUP_FIELDS)),
+        ("user", authors.order_by("pk").values(*user_fields)),
+        ("post", Post.objects.order_by("pk").values(*POST_FIELDS)),
+        ("comment", Comment.objects.order_by("pk").values(*COMMENT_FIELDS)),
+    )
+    exported = {}
+    for model, queryset in querysets:
+        exported[model] = 0
+        for row in queryset.iterator(chunk_size=chunk_size):
+            output.write(_dump(model, row))
+            exported[model] += 1
+    return exported
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил даты из файла."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Importer:
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.group_ids = {}
+        self.user_ids = {}
+        # Новые посты получают id после всех существующих.
+        self.post_shift = Post.objects.aggregate(shift=Max("pk"))["shift"] or 0
+        self.imported = {"group": 0, "user": 0, "post": 0, "comment": 0}
+        self.model = None
+        self.batch = []
+
+    def add(self, record):
+        model = record.pop("model")
+        if model not in self.imported:
+            raise ValueError(f"Неизвестная модель: {model}")
+        # Пачка сбрасывается при смене модели: ссылки уже разрешимы.
+        if model != self.model or len(self.batch) >= self.batch_size:
+            self.flush()
+            self.model = model
+        self.batch.append(record)
+
+    def flush(self):
+        if not self.batch:
+            return
+        with transaction.atomic():
+            getattr(self, f"_import_{self.model}s")(self.batch)
+        self.imported[self.model] += len(self.batch)
+        self.batch = []
+
+    def _import_groups(self, rows):
+        existing = dict(
+            Group.objects.filter(slug__in=[row["slug"] for row in rows])
+            .values_list("slug", "pk")
+        )
+        Group.objects.bulk_create(
+            Group(**{key: row[key] for key in GROUP_FIELDS[1:]})
+            for row in rows if row["slug"] not in existing
+        )
+        slugs = dict(
+            Group.objects.filter(slug__in=[row["slug"] for row in rows])
+            .values_list("slug", "pk")
+        )
+        for row in rows:
+            self.group_ids[row["id"]] = slugs[row["slug"]]
+
+    def _import_users(self, rows):
+        names = [row["username"] for row in rows]
+        existing = set(
+            User.objects.filter(username__in=names)
+            .values_list("username", flat=True)
+        )
+        users = []
+        for row in rows:
+            if row["username"] in existing:
+                continue
+            user = User(**{
+                key: row[key]
+                for key in USER_FIELDS[1:] + CREDENTIAL_FIELDS if key in row
+            })
+            if not user.password:
+                user.set_unusable_password()
+            users.append(user)
+        User.objects.bulk_create(users)
+        usernames = dict(
+            User.objects.filter(username__in=names)
+            .values_list("username", "pk")
+        )
+        for row in rows:
+            self.user_ids[row["id"]] = usernames[row["username"]]
+
+    def _import_posts(self, rows):
+        with keep_dates(Post._meta.get_field("pub_date")):
+            Post.objects.bulk_create(
+                Post(
+                    pk=row["id"] + self.post_shift,
+                    text=row["text"],
+                    pub_date=row["pub_date"],
+                    author_id=self.user_ids[row["author_id"]],
+                    group_id=self.group_ids.get(row["group_id"]),
+                    image=row["image"],
+                )
+                for row in rows
+            )
+
+    def _import_comments(self, rows):
+        with keep_dates(Comment._meta.get_field("created")):
+            Comment.objects.bulk_create(
+                Comment(
+                    text=row["text"],
+                    created=row["created"],
+                    author_id=self.user_ids[row["author_id"]],
+                    post_id=row["post_id"] + self.post_shift,
+                )
+                for row in rows
+            )
+
+    def finish(self):
+        self.flush()
+        # id постов заданы явно - счётчик последовательности надо сдвинуть.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [Post]
+            ):
+                cursor.execute(sql)
+        # bulk_create обходит сигналы: счётчики, поиск и HTML чиним целиком.
+        with transaction.atomic():
+            counters.recount()
+        get_search_backend().rebuild()
+        formatting.rerender_all()
+        return self.imported
+
+
+def import_posts(lines, batch_size=5000):
+    """Загружает строки NDJSON; возвращает {модель: число строк}."""
+    importer = Importer(batch_size)
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise ValueError(f"Строка {number}: {error}")
+        importer.add(record)
+    return importer.finish()
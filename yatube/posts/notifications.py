@@ -0,0 +1,60 @@
+"""
+Письма о новых комментариях и постах.
+
+Письма уходят через очередь core.mail: в запросе только вставляются
+строки, отправка идёт в фоне. Рассылка подписчикам сама выполняется в
+фоне пачками, поэтому у автора могут быть десятки тысяч подписчиков.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from .models import Follow, Post
+
+BATCH_SIZE = 1000
+
+
+def _post_url(post_id):
+    return settings.SITE_URL + reverse("posts:post_detail", args=[post_id])
+
+
+def notify_post_author(comment):
+    """Письмо автору поста о новом комментарии (не себе самому)."""
+    author = comment.post.author
+    if not author.email or author.pk == comment.author_id:
+        return
+    body = render_to_string("posts/emails/new_comment.txt", {
+        "comment": comment,
+        "url": _post_url(comment.post_id),
+    })
+    EmailMessage(
+        "Новый комментарий к вашему посту", body, None, [author.email]
+    ).send()
+
+
+def notify_followers(post_id):
+    """Письма всем подписчикам автора о новом посте."""
+    post = Post.objects.select_related("author").filter(pk=post_id).first()
+    if post is None:
+        return
+    body = render_to_string("posts/emails/new_post.txt", {
+        "post": post,
+        "url": _post_url(post_id),
+    })
+    subject = f"Новый пост: {post.author.get_full_name() or post.author}"
+    emails = (
+        Follow.objects.filter(author_id=post.author_id)
+        .exclude(user__email="")
+        .values_list("user__email", flat=True)
+        .iterator()
+    )
+    connection = get_connection()
+    batch = []
+    for email in emails:
+        batch.append(EmailMessage(subject, body, None, [email]))
+        if len(batch) >= BATCH_SIZE:
+            connection.send_messages(batch)
+            batch = []
+    if batch:
+        connection.send_messages(batch)
@@ -0,0 +1,109 @@
+"""
+Кэш целых страниц для анонимных посетителей.
+
+Ключ - путь плюс параметры page и cursor. В записи хранится версия пути:
+purge_path меняет версию и сбрасывает все страницы пути разом,
+purge_page удаляет одну страницу. Сброс делают сигналы (posts.signals).
+Страница, прочитанная с реплики сразу после сброса, в кэш не кладётся
+(core.routers.may_be_stale).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date
+
+from core.routers import may_be_stale, new_version
+
+PAGE_PARAMS = ("page", "cursor")
+
+
+def _page_key(path, params=None):
+    params = params or {}
+    raw = "\n".join([path] + [params.get(name, "") for name in PAGE_PARAMS])
+    return "page:" + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _version_key(path):
+    return "page:v:" + hashlib.md5(path.encode()).hexdigest()
+
+
+def purge_page(path, **params):
+    """Сбрасывает одну страницу: purge_page("/") - первая страница."""
+    cache.delete(_page_key(path, params))
+
+
+def purge_path(path):
+    """Сбрасывает все страницы пути (все номера и курсоры)."""
+    cache.set(_version_key(path), new_version(), None)
+
+
+def _set_headers(response, entry):
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    # Браузер каждый раз переспрашивает, но получает 304 без тела.
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ("Cookie",))
+    return response
+
+
+def cache_anonymous_page(view):
+    """Отдаёт анонимам страницу из кэша и отвечает 304 на условный GET."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in ("GET", "HEAD")
+            or request.user.is_authenticated
+        ):
+            return view(request, *args, **kwargs)
+        key = _page_key(request.path, request.GET)
+        version_key = _version_key(request.path)
+        found = cache.get_many([key, version_key])
+        version = found.get(version_key)
+        if version is None:
+            version = new_version()
+            cache.set(version_key, version, None)
+        entry = found.get(key)
+        if entry is not None and entry["version"] == version:
+            not_modified = get_conditional_response(
+                request, etag=entry["etag"],
+                last_modified=entry["last_modified"],
+            )
+            if not_modified is not None:
+                return _set_headers(not_modified, entry)
+            response = HttpResponse(
+                entry["content"], content_type=entry["content_type"]
+            )
+            return _set_headers(response, entry)
+
+        response = view(request, *args, **kwargs)
+        if (
+            response.status_code != 200
+            or response.streaming
+            or may_be_stale(version)
+        ):
+            return response
+        entry = {
+            "version": version,
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "etag": '"{}"'.format(
+                hashlib.md5(response.content).hexdigest()
+            ),
+            "last_modified": int(time.time()),
+        }
+        cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT)
+        _set_headers(response, entry)
+        return get_conditional_response(
+            request, etag=entry["etag"],
+            last_modified=entry["last_modified"], response=response,
+        )
+
+    return wrapper
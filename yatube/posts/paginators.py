@@ -0,0 +1,209 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Page):
+    """Страница паджинатора по ключу: вместо номеров - курсоры."""
+
+    def __init__(self, object_list, paginator, next_key=None,
+                 previous_key=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = (
+            paginator.encode_cursor(NEXT, next_key) if next_key else None
+        )
+        self.previous_cursor = (
+            paginator.encode_cursor(PREVIOUS, previous_key)
+            if previous_key else None
+        )
+
+    def __repr__(self):
+        return "<Cursor page>"
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+
+class CursorPaginator(Paginator):
+    """
+    Паджинатор по ключу (keyset).
+
+    Следующая страница выбирается условием по полям сортировки
+    (по умолчанию ``(pub_date, id)``) вместо OFFSET, а общее число
+    записей не считается, поэтому любая страница стоит одинаково.
+    """
+
+    keyset = True
+
+    def __init__(self, object_list, per_page, ordering=("-pub_date", "-id")):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    def _check_object_list_is_ordered(self):
+        # Порядок задаётся самим паджинатором.
+        pass
+
+    def encode_cursor(self, direction, key):
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in key
+        ]
+        raw = json.dumps([direction] + values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            direction, *values = json.loads(raw.decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        if direction not in (NEXT, PREVIOUS) or len(values) != len(
+            self.fields
+        ):
+            raise InvalidCursor(cursor)
+        try:
+            key = self.to_python(values)
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        # Поля ключа не бывают NULL, а filter(x__lte=None) - ошибка.
+        if None in key:
+            raise InvalidCursor(cursor)
+        return direction, key
+
+    def to_python(self, values):
+        """Значения ключа из курсора в типы полей модели."""
+        model = self.object_list.model
+        return [
+            model._meta.get_field(name).to_python(value)
+            for name, value in zip(self.fields, values)
+        ]
+
+    def get_key(self, obj):
+        if isinstance(obj, dict):
+            return [obj[name] for name in self.fields]
+        # serializable_value отдаёт id для внешних ключей.
+        return [obj.serializable_value(name) for name in self.fields]
+
+    def _seek(self, ordering, key):
+        """Условие "строго после key" для лексикографического порядка."""
+        condition = Q()
+        for position, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            step = Q(**{f"{name}__{lookup}": key[position]})
+            for prev_name, value in zip(self.fields[:position], key):
+                step &= Q(**{prev_name: value})
+            condition |= step
+        # Избыточная граница по первому полю даёт СУБД диапазон по индексу
+        # (иначе OR превращается в полный просмотр индекса).
+        first = ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": key[0]}) & condition
+
+    def get_queryset(self, ordering=None, key=None):
+        """Запрос одной страницы (с лишней строкой для has_next)."""
+        ordering = ordering or self.ordering
+        queryset = self.object_list.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self._seek(ordering, key))
+        return queryset[:self.per_page + 1]
+
+    def get_page(self, cursor):
+        """Возвращает страницу; неверный курсор ведёт на первую."""
+        try:
+            direction, key = self.decode_cursor(cursor) if cursor else (
+                NEXT, None
+            )
+        except InvalidCursor:
+            direction, key = NEXT, None
+        return self.page(direction, key)
+
+    def fetch(self, key=None, backward=False):
+        """
+        До per_page + 1 строк после key (или до него при backward,
+        тогда в обратном порядке).
+        """
+        ordering = self.ordering
+        if backward:
+            ordering = tuple(
+                name[1:] if name.startswith("-") else "-" + name
+                for name in ordering
+            )
+        return list(self.get_queryset(ordering, key))
+
+    def page(self, direction, key=None):
+        if direction == PREVIOUS and key is not None:
+            rows = self.fetch(key, backward=True)
+            if len(rows) <= self.per_page:
+                # Дошли до начала ленты - отдаём полную первую страницу.
+                return self.page(NEXT)
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(
+                rows, self,
+                next_key=self.get_key(rows[-1]),
+                previous_key=self.get_key(rows[0]),
+            )
+        rows = self.fetch(key)
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, self,
+            next_key=self.get_key(rows[-1]) if has_next else None,
+            previous_key=(
+                self.get_key(rows[0]) if key is not None and rows else None
+            ),
+        )
+
+
+class CountedPaginator(Paginator):
+    """Paginator с заранее известным числом записей (из счётчика)."""
+
+    def __init__(self, object_list, per_page, count):
+        super().__init__(object_list, per_page)
+        self.count = count
+
+
+def paginate(request, object_list, per_page, count=None):
+    """
+    Страница ленты для запроса.
+
+    По умолчанию (``POSTS_PAGINATION = "cursor"``) используется курсор;
+    старые ссылки вида ``?page=N`` продолжают работать через Paginator.
+    Если известен count (денормализованный счётчик), COUNT(*) не выполняется.
+    """
+    page_number = request.GET.get("page")
+    if (
+        getattr(settings, "POSTS_PAGINATION", "cursor") == "cursor"
+        and page_number is None
+    ):
+        return CursorPaginator(object_list, per_page).get_page(
+            request.GET.get("cursor")
+        )
+    if count is not None:
+        return CountedPaginator(object_list, per_page, count).get_page(
+            page_number
+        )
+    return Paginator(object_list, per_page).get_page(page_number)
@@ -0,0 +1,17 @@
+"""
+PIL.Image с пределом POST_IMAGE_MAX_PIXELS.
+
+Pillow не грузится при старте воркера. Каждый путь к картинкам импортирует
+его отсюда: формы постов (posts.uploads.load_pillow), админка
+(posts.admin) и sorl-thumbnail (THUMBNAIL_ENGINE = "posts.pil.Engine").
+Поэтому предел действует с первого же открытия файла.
+"""
+from django.conf import settings
+from PIL import Image
+from sorl.thumbnail.engines import pil_engine
+
+Image.MAX_IMAGE_PIXELS = settings.POST_IMAGE_MAX_PIXELS
+
+
+class Engine(pil_engine.Engine):
+    """Движок sorl-thumbnail: импорт модуля выставляет предел Pillow."""
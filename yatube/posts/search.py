@@ -0,0 +1,201 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Бэкенд выбирается настройкой POSTS_SEARCH_BACKEND. По умолчанию -
+SQLite FTS5: тексты постов и комментариев лежат в виртуальной таблице
+posts_search, индекс обновляется сигналами (см. posts.signals).
+LikeSearchBackend подходит для любой СУБД, но ищет полным просмотром.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .paginators import CursorPaginator
+
+
+class SearchBackend:
+    """Интерфейс бэкенда поиска."""
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit, key=None, backward=False):
+        """
+        Список (post_id, rank) по возрастанию (rank, post_id), строго
+        после key (или до него при backward - тогда по убыванию).
+        Чем меньше rank, тем выше пост в выдаче.
+        """
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, query):
+        """Посты queryset, подходящие под запрос (для админки)."""
+        raise NotImplementedError
+
+
+class SqliteFTS5Backend(SearchBackend):
+    """
+    Индекс FTS5. rowid документа - 2 * id для поста и 2 * id + 1 для
+    комментария, поэтому запись обновляется по rowid без просмотра таблицы.
+    """
+
+    table = "posts_search"
+
+    @classmethod
+    def create_table(cls, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {cls.table} USING fts5("
+            "text, post_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    @classmethod
+    def fill_table(cls, cursor):
+        cursor.execute(f"DELETE FROM {cls.table}")
+        cursor.execute(
+            f"INSERT INTO {cls.table} (rowid, text, post_id) "
+            "SELECT id * 2, text, id FROM posts_post"
+        )
+        cursor.execute(
+            f"INSERT INTO {cls.table} (rowid, text, post_id) "
+            "SELECT id * 2 + 1, text, post_id FROM posts_comment"
+        )
+
+    def _upsert(self, rowid, text, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {self.table} (rowid, text, post_id) "
+                "VALUES (%s, %s, %s)",
+                [rowid, text, post_id],
+            )
+
+    def _delete(self, rowid):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [rowid]
+            )
+
+    def index_post(self, post):
+        self._upsert(post.pk * 2, post.text, post.pk)
+
+    def remove_post(self, post_id):
+        self._delete(post_id * 2)
+
+    def index_comment(self, comment):
+        self._upsert(comment.pk * 2 + 1, comment.text, comment.post_id)
+
+    def remove_comment(self, comment_id):
+        self._delete(comment_id * 2 + 1)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            self.create_table(cursor)
+            self.fill_table(cursor)
+
+    @staticmethod
+    def match_expression(query):
+        """Слова запроса как фразы FTS5: спецсимволы не интерпретируются."""
+        return " ".join(
+            '"{}"'.format(word.replace('"', '""')) for word in query.split()
+        )
+
+    def search(self, query, limit, key=None, backward=False):
+        having, params = "", [self.match_expression(query)]
+        if key is not None:
+            sign = "<" if backward else ">"
+            having = (
+                f"HAVING best_rank {sign} %s "
+                f"OR (best_rank = %s AND post_id {sign} %s)"
+            )
+            params += [key[0], key[0], key[1]]
+        order = "DESC" if backward else "ASC"
+        with connection.cursor() as cursor:
+            # Пост ранжируется по лучшему из своих документов; rank -
+            # скрытый столбец FTS5 (bm25), bm25() в агрегате недопустим.
+            cursor.execute(
+                "SELECT post_id, MIN(doc_rank) AS best_rank FROM ("
+                "SELECT post_id, rank AS doc_rank "
+                f"FROM {self.table} WHERE {self.table} MATCH %s"
+                f") GROUP BY post_id {having} "
+                f"ORDER BY best_rank {order}, post_id {order} LIMIT %s",
+                params + [limit],
+            )
+            return cursor.fetchall()
+
+    def filter_queryset(self, queryset, query):
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT post_id FROM {self.table} WHERE {self.table} MATCH %s",
+            [self.match_expression(query)],
+        ))
+
+
+class LikeSearchBackend(SearchBackend):
+    """Поиск через LIKE для СУБД без FTS5; все совпадения равны (rank 0)."""
+
+    def _matches(self, queryset, query):
+        for word in query.split():
+            queryset = queryset.filter(
+                Q(text__icontains=word) | Q(comments__text__icontains=word)
+            )
+        return queryset.distinct()
+
+    def search(self, query, limit, key=None, backward=False):
+        posts = self._matches(Post.objects.all(), query).order_by(
+            "-id" if backward else "id"
+        )
+        if key is not None:
+            posts = posts.filter(
+                **{"id__lt" if backward else "id__gt": key[1]}
+            )
+        ids = posts.values_list("pk", flat=True)[:limit]
+        return [(pk, 0.0) for pk in ids]
+
+    def filter_queryset(self, queryset, query):
+        return self._matches(queryset, query)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорная выдача поиска по ключу (rank, id поста)."""
+
+    def __init__(self, query, per_page):
+        super().__init__(
+            Post.objects.feed(), per_page, ordering=("search_rank", "id")
+        )
+        self.query = query
+
+    def to_python(self, values):
+        return [float(values[0]), int(values[1])]
+
+    def fetch(self, key=None, backward=False):
+        hits = get_backend().search(
+            self.query, self.per_page + 1, key=key, backward=backward
+        )
+        posts = self.object_list.in_bulk([post_id for post_id, _ in hits])
+        rows = []
+        for post_id, rank in hits:
+            # Пост мог быть удалён в обход сигналов - просто пропускаем.
+            if post_id in posts:
+                posts[post_id].search_rank = rank
+                rows.append(posts[post_id])
+        return rows
@@ -0,0 +1,177 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from core.tasks import run_in_background
+
+from . import counters, formatting, notifications, timeline
+from .search import get_backend as get_search_backend
+from .cards import bump_version
+from .models import Comment, Follow, Group, Post, User
+from .page_cache import purge_page, purge_path
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    bump_version("post", instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    bump_version("group", instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_author_cards(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login - карточки не меняются.
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    bump_version("user", instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def render_text(sender, instance, update_fields=None, **kwargs):
+    # При save(update_fields=[..., "text"]) перечисляйте и поля text_*.
+    if update_fields is None or "text" in update_fields:
+        formatting.render(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    # Группу меняют при редактировании поста и в list_editable админки.
+    if not instance._state.adding:
+        instance._saved_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    # Пост виден на первой странице главной, в ленте группы и профиля.
+    purge_page(reverse("posts:index"))
+    purge_path(reverse("posts:profile", args=[instance.author.username]))
+    purge_path(reverse("posts:post_detail", args=[instance.pk]))
+    group_ids = {
+        instance.group_id, getattr(instance, "_saved_group_id", None)
+    } - {None}
+    for slug in Group.objects.filter(pk__in=group_ids).values_list(
+        "slug", flat=True
+    ):
+        purge_path(reverse("posts:group_list", args=[slug]))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    purge_path(reverse("posts:post_detail", args=[instance.post_id]))
+    purge_path(reverse("posts:post_comments", args=[instance.post_id]))
+
+
+@receiver([post_save, post_delete], sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    purge_page(reverse("posts:index"))
+    purge_path(reverse("posts:group_list", args=[instance.slug]))
+
+
+@receiver([post_save, post_delete], sender=User)
+def purge_author_pages(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    purge_page(reverse("posts:index"))
+    purge_path(reverse("posts:profile", args=[instance.username]))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_posts(instance.author_id, 1)
+        counters.change_group_posts(instance.group_id, 1)
+        return
+    old_group_id = getattr(instance, "_saved_group_id", instance.group_id)
+    if old_group_id != instance.group_id:
+        counters.change_group_posts(old_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author_posts(instance.author_id, -1)
+    counters.change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if not created:
+        return
+    followers = counters.get_followers_count(instance.author_id)
+    if 0 < followers <= settings.TIMELINE_FANOUT_LIMIT:
+        run_in_background(timeline.fan_out_post, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def notify_new_post(sender, instance, created, **kwargs):
+    if created and counters.get_followers_count(instance.author_id):
+        run_in_background(notifications.notify_followers, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def notify_new_comment(sender, instance, created, **kwargs):
+    # Письмо ставится в очередь в той же транзакции, что и комментарий.
+    if created:
+        notifications.notify_post_author(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_author(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_followers(instance.author_id, 1)
+        if not timeline.is_celebrity(instance.author_id):
+            run_in_background(
+                timeline.backfill, instance.user_id, instance.author_id
+            )
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_author(sender, instance, **kwargs):
+    counters.change_author_followers(instance.author_id, -1)
+    run_in_background(timeline.prune, instance.user_id, instance.author_id)
+    # Счётчик читается в транзакции удаления, после своего UPDATE:
+    # ровно одна отписка видит переход через порог вниз.
+    followers = counters.get_followers_count(instance.author_id)
+    if followers == settings.TIMELINE_FANOUT_LIMIT:
+        run_in_background(timeline.backfill_followers, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    get_search_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_search_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    get_search_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    get_search_backend().remove_comment(instance.pk)
@@ -0,0 +1,13 @@
+from django import template
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов страницы из кэша (см. posts.cards)."""
+    return render_cards(
+        posts, profile=context.get("profile"), group=context.get("group")
+    )
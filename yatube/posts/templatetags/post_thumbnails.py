@@ -0,0 +1,18 @@
+from django import template
+
+from posts.thumbnails import get_ready_thumbnail, schedule_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, geometry):
+    """
+    Готовая миниатюра картинки поста или, пока её строит фоновая
+    задача, сам оригинал. У обоих есть url.
+    """
+    thumbnail = get_ready_thumbnail(image, geometry)
+    if thumbnail is not None:
+        return thumbnail
+    schedule_thumbnails(image.name)
+    return image
@@ -1,9 +1,30 @@
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+from concurrent.futures import Future
+from unittest import mock
+
+import sorl
 from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
-from django.test import TestCase, Client
+from django.test import (
+    Client, RequestFactory, TestCase, override_settings
+)
 
 
 from posts.models import Post, Group, User
+from posts.thumbnails import (
+    SORL_VERSION, get_ready_thumbnail, schedule_thumbnails
+)
+from posts.uploads import StreamingImageUploadHandler
 
 
 URL_INDEX = reverse("posts:index")
@@ -89,3 +110,204 @@ class PostFormTest(TestCase):
                     expected_type,
                     f"Неверний тип для поля формы - {field}",
                 )
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00\x3B"
+)
+
+
+def png_header(width, height):
+    """PNG без пикселей, но с заявленным размером width x height."""
+    def chunk(kind, data):
+        crc = struct.pack(">I", zlib.crc32(kind + data))
+        return struct.pack(">I", len(data)) + kind + data + crc
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(b""))
+        + chunk(b"IEND", b"")
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageFormTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_post_author = User.objects.create_user(
+            username=AUTHOR_USERNAME
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.author_client = Client()
+        self.author_client.force_login(PostImageFormTest.test_post_author)
+
+    def create_post_with_image(self, name):
+        self.author_client.post(
+            URL_CREATE_POST,
+            data={
+                "text": "Пост с картинкой",
+                "image": SimpleUploadedFile(name, SMALL_GIF, "image/gif"),
+            },
+        )
+        post = Post.objects.latest("id")
+        response = self.author_client.get(
+            reverse("posts:post_detail", args=[post.id])
+        )
+        return post, response
+
+    def test_detail_shows_original_while_thumbnail_pending(self):
+        post, response = self.create_post_with_image("pending.gif")
+        self.assertEqual(post.image.name, "posts/pending.gif")
+        self.assertContains(response, post.image.url)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_thumbnail_generated_on_save(self):
+        post, response = self.create_post_with_image("ready.gif")
+        self.assertNotContains(response, post.image.url)
+        self.assertContains(response, "/media/cache/")
+
+    def test_ready_thumbnail_purges_cached_page(self):
+        with mock.patch("posts.thumbnails.run_in_process") as run:
+            post, _ = self.create_post_with_image("cached.gif")
+        url = reverse("posts:post_detail", args=[post.id])
+        self.assertContains(self.client.get(url), post.image.url)
+        func, name = run.call_args[0]
+        future = Future()
+        future.set_result(func(name))
+        with self.settings(BACKGROUND_TASKS_EAGER=True):
+            run.call_args[1]["callback"](future)
+        response = self.client.get(url)
+        self.assertNotContains(response, post.image.url)
+        self.assertContains(response, "/media/cache/")
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_ready_thumbnail_matches_sorl(self):
+        from sorl.thumbnail import get_thumbnail
+
+        # _thumbnail_name повторяет внутренности sorl: при обновлении
+        # пакета сверить его и поднять SORL_VERSION.
+        self.assertEqual(sorl.__version__, SORL_VERSION)
+        post, _ = self.create_post_with_image("match.gif")
+        for geometry, options in settings.POST_THUMBNAILS.items():
+            with self.subTest(geometry=geometry):
+                self.assertEqual(
+                    get_ready_thumbnail(post.image, geometry).name,
+                    get_thumbnail(post.image, geometry, **options).name,
+                )
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_failed_thumbnail_is_not_retried_until_delay(self):
+        cache.clear()
+        with mock.patch(
+            "posts.thumbnails.generate_thumbnails", side_effect=OSError
+        ) as generate, self.assertLogs("core.tasks", "ERROR"):
+            schedule_thumbnails("posts/broken.gif")
+            schedule_thumbnails("posts/broken.gif")
+        self.assertEqual(generate.call_count, 1)
+        cache.clear()
+        with mock.patch("posts.thumbnails.generate_thumbnails") as generate:
+            schedule_thumbnails("posts/broken.gif")
+        self.assertEqual(generate.call_count, 1)
+
+    def post_image(self, content, name="image.png"):
+        return self.author_client.post(
+            URL_CREATE_POST,
+            data={
+                "text": "Пост с картинкой",
+                "image": SimpleUploadedFile(name, content, "image/png"),
+            },
+        )
+
+    def test_decompression_bomb_rejected_by_header(self):
+        posts_count = Post.objects.count()
+        response = self.post_image(png_header(8000, 8000))
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertFormError(
+            response, "form", "image",
+            "Слишком большое разрешение картинки: 8000x8000."
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIZE=16)
+    def test_oversized_upload_rejected(self):
+        posts_count = Post.objects.count()
+        response = self.post_image(SMALL_GIF, name="big.gif")
+        self.assertEqual(Post.objects.count(), posts_count)
+        self.assertTrue(response.context["form"].has_error("image"))
+
+    @override_settings(POST_IMAGE_MAX_SIZE=16)
+    def test_size_limit_is_enforced_in_admin_form(self):
+        # Админка грузит файл обычными обработчиками, без усечения.
+        request = RequestFactory().get("/")
+        self.assertFalse(any(
+            isinstance(handler, StreamingImageUploadHandler)
+            for handler in request.upload_handlers
+        ))
+        request.user = PostImageFormTest.test_post_author
+        form_class = admin.site._registry[Post].get_form(request)
+        form = form_class(
+            data={"text": "Из админки", "author": self.test_post_author.pk},
+            files={
+                "image": SimpleUploadedFile("big.gif", SMALL_GIF, "image/gif")
+            },
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors.as_data()["image"][0].code, "file_too_large"
+        )
+
+    def test_edit_keeps_missing_image_file(self):
+        # Сохранённый файл при правке текста не проверяется и не читается.
+        post = Post.objects.create(
+            text="Пост", author=PostImageFormTest.test_post_author,
+            image="posts/missing.gif",
+        )
+        response = self.author_client.post(
+            reverse("posts:edit", args=[post.id]),
+            data={"text": "Новый текст"},
+        )
+        self.assertRedirects(
+            response, reverse("posts:post_detail", args=[post.id]),
+            fetch_redirect_response=False,
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, "Новый текст")
+        self.assertEqual(post.image.name, "posts/missing.gif")
+
+    def test_pillow_limit_applies_to_admin_and_sorl(self):
+        # Чистый процесс: в тестовом Pillow уже загружен формами.
+        for path in (
+            "from django.contrib import admin; admin.autodiscover()",
+            "from sorl.thumbnail import default; default.engine.__class__",
+        ):
+            with self.subTest(path=path):
+                result = subprocess.run(
+                    [sys.executable, "-c", (
+                        "import django; django.setup(); "
+                        f"{path}; "
+                        "from PIL import Image; "
+                        "print(Image.MAX_IMAGE_PIXELS)"
+                    )],
+                    cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+                    universal_newlines=True, check=True,
+                    env={**os.environ, "YATUBE_LAZY_ADMIN": "1"},
+                )
+                self.assertEqual(
+                    int(result.stdout), settings.POST_IMAGE_MAX_PIXELS
+                )
+
+    def test_header_only_validation_accepts_image(self):
+        self.post_image(png_header(2, 1))
+        self.assertEqual(
+            Post.objects.latest("id").image.name, "posts/image.png"
+        )
@@ -1,8 +1,18 @@
+import datetime
+import os
+import tempfile
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Group, Post
+from posts import formatting
+from posts.benchmark import isolated_cache, seed
+from posts.models import AuthorCounter, Comment, Group, Post
 
 User = get_user_model()
 
@@ -34,3 +44,182 @@ class PostModelTest(TestCase):
         """Проверяем, что у моделей корректно работает str."""
         self.assertEqual(PostModelTest.post.text[:15], str(PostModelTest.post))
         self.assertEqual(PostModelTest.group.title, str(PostModelTest.group))
+
+
+class QueryPlanTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не просматривают таблицы целиком."""
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+        self.assertIn("USING INDEX", out.getvalue())
+
+
+class CounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug=GROUP_SLUG,
+            description="Тестовое описание",
+        )
+        cls.group_2 = Group.objects.create(
+            title="Вторая группа", slug="second", description="Описание"
+        )
+
+    def counts(self, post=None):
+        self.group.refresh_from_db()
+        self.group_2.refresh_from_db()
+        result = [
+            AuthorCounter.objects.get(author=self.user).posts_count,
+            self.group.posts_count,
+            self.group_2.posts_count,
+        ]
+        if post is not None:
+            post.refresh_from_db()
+            result.append(post.comments_count)
+        return result
+
+    def test_counters_follow_creates_edits_and_deletes(self):
+        post = Post.objects.create(
+            author=self.user, text="Пост", group=self.group
+        )
+        Post.objects.create(author=self.user, text="Без группы")
+        Comment.objects.create(post=post, author=self.user, text="Комм")
+        self.assertEqual(self.counts(post), [2, 1, 0, 1])
+        post.group = self.group_2
+        post.save()
+        self.assertEqual(self.counts(post), [2, 0, 1, 1])
+        post.comments.all().delete()
+        self.assertEqual(self.counts(post), [2, 0, 1, 0])
+        post.delete()
+        self.assertEqual(self.counts(), [1, 0, 0])
+
+    def test_recount_repairs_drift(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text="Пост", group=self.group)
+            for _ in range(3)
+        )
+        call_command("recount", stdout=StringIO())
+        self.assertEqual(self.counts(), [3, 3, 0])
+
+
+class NdjsonTransferTest(TestCase):
+    def test_export_and_import_keep_data_and_dates(self):
+        author = User.objects.create_user(username=AUTHOR_USERNAME)
+        reader = User.objects.create_user(username="reader")
+        group = Group.objects.create(
+            title="Test group", slug=GROUP_SLUG, description="Test desc"
+        )
+        post = Post.objects.create(text="Старый пост", author=author,
+                                   group=group)
+        published = timezone.now() - datetime.timedelta(days=30)
+        Post.objects.filter(pk=post.pk).update(pub_date=published)
+        post.comments.create(author=reader, text="Комментарий")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "posts.ndjson")
+        call_command("export_posts", output=path, stderr=StringIO())
+
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        reader.delete()
+        call_command("import_posts", path, batch_size=1, stdout=StringIO())
+
+        imported = Post.objects.get()
+        self.assertEqual(imported.text, "Старый пост")
+        self.assertEqual(imported.pub_date, published)
+        self.assertEqual(imported.author, author)
+        self.assertEqual(imported.group.slug, GROUP_SLUG)
+        self.assertEqual(imported.group.posts_count, 1)
+        comment = imported.comments.get()
+        self.assertEqual(comment.author.username, "reader")
+        self.assertEqual(imported.comments_count, 1)
+        self.assertEqual(imported.text_version, formatting.TEXT_FORMAT_VERSION)
+
+    def export_reader(self, **options):
+        author = User.objects.create_user(username=AUTHOR_USERNAME)
+        reader = User.objects.create_user(
+            username="reader", email="reader@example.com", password="secret"
+        )
+        post = Post.objects.create(text="Пост", author=author)
+        post.comments.create(author=reader, text="Комментарий")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "posts.ndjson")
+        call_command(
+            "export_posts", output=path, stderr=StringIO(), **options
+        )
+        reader.delete()
+        call_command("import_posts", path, stdout=StringIO())
+        with open(path, encoding="utf-8") as dump:
+            return dump.read(), User.objects.get(username="reader")
+
+    def test_credentials_are_not_exported_by_default(self):
+        content, reader = self.export_reader()
+        self.assertNotIn("reader@example.com", content)
+        self.assertNotIn("pbkdf2", content)
+        self.assertEqual(reader.email, "")
+        self.assertFalse(reader.has_usable_password())
+
+    def test_credentials_are_exported_on_request(self):
+        content, reader = self.export_reader(with_credentials=True)
+        self.assertEqual(reader.email, "reader@example.com")
+        self.assertTrue(reader.check_password("secret"))
+
+
+class BenchmarkSeedTest(TestCase):
+    def test_seeded_posts_keep_spread_dates(self):
+        seed(users=2, groups=1, posts=20, comments=5)
+        dates = list(Post.objects.values_list("pub_date", flat=True))
+        self.assertEqual(len(dates), 20)
+        self.assertGreater(len(set(dates)), 1)
+        self.assertLess(
+            min(dates), timezone.now() - datetime.timedelta(days=1)
+        )
+
+    def test_run_does_not_touch_site_cache(self):
+        cache.set("site-page", "страница")
+        with isolated_cache():
+            self.assertIsNone(cache.get("site-page"))
+            cache.set("site-page", "прогон")
+        self.assertEqual(cache.get("site-page"), "страница")
+
+
+class RenderedTextTest(TestCase):
+    def test_text_rendered_on_save(self):
+        author = User.objects.create_user(username=AUTHOR_USERNAME)
+        post = Post.objects.create(
+            text="Первая <b>строка</b>\nвторая строка, длинная", author=author
+        )
+        self.assertEqual(
+            post.text_html,
+            "<p>Первая &lt;b&gt;строка&lt;/b&gt;<br>"
+            "вторая строка, длинная</p>",
+        )
+        self.assertEqual(len(post.text_title), 30)
+        self.assertEqual(post.text_version, formatting.TEXT_FORMAT_VERSION)
+        response = self.client.get(URL_INDEX)
+        self.assertContains(response, post.text_html)
+
+    def test_rerender_texts_updates_stale_rows(self):
+        author = User.objects.create_user(username=AUTHOR_USERNAME)
+        Post.objects.bulk_create(
+            Post(text=f"Пост {number}", author=author) for number in range(3)
+        )
+        post = Post.objects.first()
+        Comment.objects.bulk_create([
+            Comment(text="Комментарий", author=author, post=post)
+        ])
+        out = StringIO()
+        call_command("rerender_texts", batch_size=2, stdout=out)
+        self.assertIn("'posts': 3, 'comments': 1", out.getvalue())
+        self.assertFalse(
+            Post.objects.exclude(
+                text_version=formatting.TEXT_FORMAT_VERSION
+            ).exists()
+        )
+        self.assertEqual(
+            Comment.objects.get().text_html, "<p>Комментарий</p>"
+        )
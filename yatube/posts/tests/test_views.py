@@ -1,9 +1,21 @@
-from django.test import Client, TestCase
+import json
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 
-from posts.models import Post, Group, User
-from posts.views import POST_COUNT
+from core.queries import assert_max_queries, assert_view_budget
+from posts.cards import render_cards
+from posts.models import Follow, Post, Group, TimelineEntry, User
+from posts.views import COMMENT_COUNT, POST_COUNT
 from posts.forms import PostForm
 
 
@@ -135,3 +147,638 @@ class PaginatorViewTest(TestCase):
                 author=PaginatorViewTest.test_post_author
             ).count(),
         )
+
+
+class CursorPaginatorViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_post_author = User.objects.create_user(
+            username=AUTHOR_USERNAME
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.test_post_author, text=f"Пост - {i}")
+            for i in range(POST_COUNT + 3)
+        )
+
+    def test_cursor_pages_cover_feed_in_order(self):
+        first = self.client.get(URL_INDEX).context["page_obj"]
+        self.assertEqual(len(first), POST_COUNT)
+        self.assertFalse(first.has_previous())
+        second = self.client.get(
+            URL_INDEX, {"cursor": first.next_cursor}
+        ).context["page_obj"]
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            list(first) + list(second),
+            list(Post.objects.order_by("-pub_date", "-id")),
+        )
+        back = self.client.get(
+            URL_INDEX, {"cursor": second.previous_cursor}
+        ).context["page_obj"]
+        self.assertEqual(list(back), list(first))
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(URL_INDEX, {"cursor": "не курсор"})
+        self.assertEqual(len(response.context["page_obj"]), POST_COUNT)
+
+    def test_cursor_with_null_key_returns_first_page(self):
+        # base64 от ["n", null, null]
+        cursor = "WyJuIiwgbnVsbCwgbnVsbF0"
+        response = self.client.get(URL_INDEX, {"cursor": cursor})
+        self.assertEqual(len(response.context["page_obj"]), POST_COUNT)
+        post = Post.objects.first()
+        response = self.client.get(
+            reverse("posts:post_comments", args=[post.id]),
+            {"cursor": cursor},
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            reverse("posts:api_index"), {"cursor": cursor}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_post_author = User.objects.create_user(
+            username=AUTHOR_USERNAME
+        )
+        cls.test_group = Group.objects.create(
+            title="Test group", slug=GROUP_SLUG, description="Test desc"
+        )
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            text="Исходный текст",
+            author=PostCardCacheTest.test_post_author,
+            group=PostCardCacheTest.test_group,
+        )
+
+    def test_card_is_served_from_cache(self):
+        self.client.get(URL_INDEX)
+        Post.objects.filter(pk=self.post.pk).update(text="Мимо сигналов")
+        response = self.client.get(URL_INDEX)
+        self.assertContains(response, "Исходный текст")
+
+    def test_card_invalidated_on_post_group_and_author_save(self):
+        self.client.get(URL_INDEX)
+        self.post.text = "Новый текст"
+        self.post.save()
+        self.assertContains(self.client.get(URL_INDEX), "Новый текст")
+        group = PostCardCacheTest.test_group
+        group.title = "Новое имя группы"
+        group.save()
+        self.assertContains(self.client.get(URL_INDEX), "Новое имя группы")
+        author = PostCardCacheTest.test_post_author
+        author.first_name = "Алексей"
+        author.save()
+        self.assertContains(self.client.get(URL_INDEX), "Алексей")
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_post_author = User.objects.create_user(
+            username=AUTHOR_USERNAME
+        )
+        cls.test_group = Group.objects.create(
+            title="Test group", slug=GROUP_SLUG, description="Test desc"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text="Исходный текст",
+            author=PageCacheTest.test_post_author,
+            group=PageCacheTest.test_group,
+        )
+        self.url_post_detail = reverse(
+            "posts:post_detail", args=[self.post.pk]
+        )
+
+    def test_anonymous_page_is_served_without_queries(self):
+        for url in [URL_INDEX, URL_GROUP, URL_AUTHOR, self.url_post_detail]:
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertContains(response, "Исходный текст")
+                self.assertIn("ETag", response)
+                self.assertIn("Last-Modified", response)
+
+    def test_page_read_from_lagging_replica_is_not_cached(self):
+        with mock.patch(
+            "posts.page_cache.may_be_stale", return_value=True
+        ), mock.patch("posts.cards.may_be_stale", return_value=True):
+            self.client.get(URL_INDEX)
+        Post.objects.filter(pk=self.post.pk).update(
+            text="С primary", text_html="С primary"
+        )
+        self.assertContains(self.client.get(URL_INDEX), "С primary")
+        with self.assertNumQueries(0):
+            self.client.get(URL_INDEX)
+
+    def test_authorized_user_bypasses_cache(self):
+        self.client.get(URL_INDEX)
+        client = Client()
+        client.force_login(PageCacheTest.test_post_author)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(URL_INDEX)
+        self.assertTrue(queries)
+        self.assertNotIn("ETag", response)
+
+    def test_conditional_get_returns_not_modified(self):
+        response = self.client.get(URL_INDEX)
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(
+                URL_INDEX, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        not_modified = self.client.get(
+            URL_INDEX, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_new_post_purges_its_pages(self):
+        other_post = Post.objects.create(
+            text="Другой пост", author=PageCacheTest.test_post_author
+        )
+        url_other_post = reverse("posts:post_detail", args=[other_post.pk])
+        for url in [URL_INDEX, URL_GROUP, URL_AUTHOR, url_other_post]:
+            self.client.get(url)
+        Post.objects.create(
+            text="Свежий пост",
+            author=PageCacheTest.test_post_author,
+            group=PageCacheTest.test_group,
+        )
+        for url in [URL_INDEX, URL_GROUP, URL_AUTHOR]:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), "Свежий пост")
+        with self.assertNumQueries(0):
+            self.client.get(url_other_post)
+
+    def test_new_comment_purges_only_post_detail(self):
+        self.client.get(URL_INDEX)
+        self.client.get(self.url_post_detail)
+        self.post.comments.create(
+            author=PageCacheTest.test_post_author, text="Новый комментарий"
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url_post_detail)
+        self.assertTrue(queries)
+        with self.assertNumQueries(0):
+            self.client.get(URL_INDEX)
+
+
+class CommentStreamTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.post = Post.objects.create(text="Вирусный пост", author=cls.author)
+        for i in range(COMMENT_COUNT + 5):
+            user = User.objects.create_user(username=f"reader_{i}")
+            cls.post.comments.create(author=user, text=f"Комментарий {i}")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_chunk_is_inline_and_rest_is_loaded_by_cursor(self):
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.id])
+        )
+        first = response.context["comments"]
+        self.assertEqual(len(first), COMMENT_COUNT)
+        self.assertEqual(first[0].text, "Комментарий 0")
+        self.assertTrue(first.has_next())
+        url = reverse("posts:post_comments", args=[self.post.id])
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"cursor": first.next_cursor})
+        rest = response.context["comments"]
+        self.assertEqual(
+            [comment.text for comment in rest],
+            [f"Комментарий {i}" for i in range(COMMENT_COUNT, len(first) + 5)],
+        )
+        self.assertFalse(rest.has_next())
+        self.assertNotContains(response, "Показать ещё")
+
+    def test_new_comment_purges_comment_chunks(self):
+        url = reverse("posts:post_comments", args=[self.post.id])
+        self.client.get(url)
+        self.post.comments.create(author=self.author, text="Новый")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertTrue(queries)
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR_USERNAME, first_name="Алексей"
+        )
+        cls.group = Group.objects.create(
+            title="Test group", slug=GROUP_SLUG, description="Test desc"
+        )
+        for i in range(POST_COUNT + 2):
+            cls.post = Post.objects.create(
+                text=f"Пост {i}", author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        return response, json.loads(b"".join(response.streaming_content))
+
+    def test_feeds_are_paginated_by_cursor(self):
+        urls = [
+            reverse("posts:api_index"),
+            reverse("posts:api_group", args=[GROUP_SLUG]),
+            reverse("posts:api_profile", args=[AUTHOR_USERNAME]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response, first = self.get_json(url)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertEqual(len(first["results"]), POST_COUNT)
+                self.assertEqual(
+                    set(first["results"][0]),
+                    {"id", "text", "pub_date", "author", "group"},
+                )
+                _, rest = self.get_json(url, cursor=first["next_cursor"])
+                self.assertEqual(
+                    [item["text"] for item in rest["results"]],
+                    ["Пост 1", "Пост 0"],
+                )
+                self.assertIsNone(rest["next_cursor"])
+
+    def test_sparse_fieldsets(self):
+        url = reverse("posts:api_index")
+        _, page = self.get_json(url, fields="id,author_name,text_html")
+        self.assertEqual(page["results"][0], {
+            "id": self.post.id,
+            "author_name": "Алексей",
+            "text_html": f"<p>Пост {POST_COUNT + 1}</p>",
+        })
+        author = User.objects.create_user(username="nameless")
+        Post.objects.create(text="Пост", author=author, image="posts/x.png")
+        _, page = self.get_json(url, fields="author_name,image", limit=2)
+        self.assertEqual(page["results"], [
+            {"author_name": "nameless", "image": "/media/posts/x.png"},
+            {"author_name": "Алексей", "image": None},
+        ])
+        response = self.client.get(url, {"fields": "id,password"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json()["error"])
+
+    def test_etag_changes_with_post(self):
+        url = reverse("posts:api_post", args=[self.post.id])
+        response = self.client.get(url)
+        self.assertEqual(response.json()["text"], f"Пост {POST_COUNT + 1}")
+        etag = response["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.post.text = "Исправленный пост"
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_with_comments_count(self):
+        url = reverse("posts:api_post", args=[self.post.id])
+        params = {"fields": "id,comments_count"}
+        etag = self.client.get(url, params)["ETag"]
+        # Счётчик меняется через update(), без post_save поста.
+        self.post.comments.create(author=self.author, text="Комментарий")
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["comments_count"], 1)
+
+    def test_missing_objects(self):
+        urls = [
+            reverse("posts:api_group", args=["missing"]),
+            reverse("posts:api_profile", args=["missing"]),
+            reverse("posts:api_post", args=[0]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@skipUnless(settings.JINJA2_AVAILABLE, "Jinja2 не установлен")
+class Jinja2FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title="Test group", slug=GROUP_SLUG, description="Test desc"
+        )
+        for i in range(POST_COUNT + 1):
+            Post.objects.create(
+                text=f"Пост <{i}>", author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_render_the_same_posts_with_jinja2(self):
+        engines = dict.fromkeys(settings.FEED_TEMPLATE_ENGINES, "jinja2")
+        for url in (URL_INDEX, URL_GROUP, URL_AUTHOR):
+            with self.subTest(url=url):
+                django_page = self.client.get(url)
+                cache.clear()
+                with self.settings(FEED_TEMPLATE_ENGINES=engines):
+                    jinja_page = self.client.get(url)
+                # Сигнал template_rendered шлют только Django-шаблоны.
+                self.assertTrue(django_page.templates)
+                self.assertEqual(jinja_page.templates, [])
+                self.assertContains(jinja_page, "Пост &lt;10&gt;")
+                self.assertNotContains(jinja_page, "Пост &lt;0&gt;")
+                self.assertContains(jinja_page, "?cursor=")
+
+    def test_cards_render_the_same_html_with_jinja2(self):
+        posts = Post.objects.select_related("author", "group")
+        for profile, group in ((False, False), (True, False), (False, True)):
+            with self.subTest(profile=profile, group=group):
+                django_html = "".join(render_cards(posts, profile, group))
+                jinja_html = "".join(render_cards(
+                    posts, profile, group, using="jinja2"
+                ))
+                # Движки по-разному расставляют пробелы между тегами.
+                self.assertHTMLEqual(jinja_html, django_html)
+
+
+class FeedQueryCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_post_author = User.objects.create_user(
+            username=AUTHOR_USERNAME
+        )
+        cls.test_group = Group.objects.create(
+            title="Test group", slug=GROUP_SLUG, description="Test desc"
+        )
+
+    def count_queries(self, address):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(address)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Число запросов ленты не растёт с числом постов на странице."""
+        author = FeedQueryCountTest.test_post_author
+        post = Post.objects.create(
+            text="Пост", author=author, group=FeedQueryCountTest.test_group
+        )
+        url_detail = reverse("posts:post_detail", args=[post.id])
+        addresses = [URL_INDEX, URL_GROUP, URL_AUTHOR, url_detail]
+        single = [self.count_queries(address) for address in addresses]
+        for i in range(POST_COUNT):
+            user = User.objects.create_user(username=f"user_{i}")
+            Post.objects.create(
+                text=f"Пост {i}", author=user,
+                group=FeedQueryCountTest.test_group
+            )
+            post.comments.create(author=user, text=f"Комментарий {i}")
+        full = [self.count_queries(address) for address in addresses]
+        self.assertEqual(single, full)
+
+    def test_views_fit_query_budget(self):
+        author = FeedQueryCountTest.test_post_author
+        for i in range(POST_COUNT + 1):
+            post = Post.objects.create(
+                text=f"Пост {i}", author=author,
+                group=FeedQueryCountTest.test_group
+            )
+            post.comments.create(author=author, text=f"Комментарий {i}")
+        self.client.force_login(author)
+        addresses = [
+            URL_INDEX, URL_GROUP, URL_AUTHOR, URL_CREATE_POST,
+            reverse("posts:post_detail", args=[post.id]),
+            reverse("posts:post_comments", args=[post.id]),
+            reverse("posts:edit", args=[post.id]),
+            reverse("posts:follow_index"),
+            reverse("posts:search") + "?q=Пост",
+            reverse("posts:api_index"),
+            reverse("posts:api_group", args=[GROUP_SLUG]),
+            reverse("posts:api_profile", args=[AUTHOR_USERNAME]),
+            reverse("posts:api_post", args=[post.id]),
+        ]
+        for address in addresses:
+            with self.subTest(address=address):
+                cache.clear()
+                response = assert_view_budget(self.client, address)
+                self.assertEqual(response.status_code, 200)
+
+    def test_budget_error_lists_duplicate_queries(self):
+        with self.assertRaisesRegex(AssertionError, "Повторяющиеся"):
+            with assert_max_queries(1):
+                for _ in range(2):
+                    list(User.objects.filter(pk=1))
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class FollowTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_post_author = User.objects.create_user(
+            username=AUTHOR_USERNAME
+        )
+        cls.reader = User.objects.create_user(username="reader")
+        cls.old_post = Post.objects.create(
+            text="Старый пост", author=cls.test_post_author
+        )
+        cls.URL_FOLLOW_INDEX = reverse("posts:follow_index")
+        cls.URL_FOLLOW = reverse(
+            "posts:profile_follow", args=[AUTHOR_USERNAME]
+        )
+        cls.URL_UNFOLLOW = reverse(
+            "posts:profile_unfollow", args=[AUTHOR_USERNAME]
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(FollowTimelineTest.reader)
+
+    def timeline(self):
+        response = self.reader_client.get(
+            FollowTimelineTest.URL_FOLLOW_INDEX
+        )
+        return list(response.context["page_obj"])
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        self.reader_client.get(FollowTimelineTest.URL_FOLLOW)
+        self.assertEqual(self.timeline(), [FollowTimelineTest.old_post])
+        new_post = Post.objects.create(
+            text="Новый пост", author=FollowTimelineTest.test_post_author
+        )
+        self.assertEqual(
+            self.timeline(), [new_post, FollowTimelineTest.old_post]
+        )
+        self.reader_client.get(FollowTimelineTest.URL_UNFOLLOW)
+        self.assertEqual(self.timeline(), [])
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=FollowTimelineTest.reader
+            ).exists()
+        )
+
+    def test_cannot_follow_self(self):
+        author_client = Client()
+        author_client.force_login(FollowTimelineTest.test_post_author)
+        author_client.get(FollowTimelineTest.URL_FOLLOW)
+        self.assertFalse(Follow.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_merged_on_read(self):
+        self.reader_client.get(FollowTimelineTest.URL_FOLLOW)
+        new_post = Post.objects.create(
+            text="Новый пост", author=FollowTimelineTest.test_post_author
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(
+            self.timeline(), [new_post, FollowTimelineTest.old_post]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_back_under_limit_is_fanned_out(self):
+        author = FollowTimelineTest.test_post_author
+        fan = User.objects.create_user(username="fan")
+        late = User.objects.create_user(username="late")
+        self.reader_client.get(FollowTimelineTest.URL_FOLLOW)
+        Follow.objects.create(user=fan, author=author)
+        Follow.objects.create(user=late, author=author)
+        new_post = Post.objects.create(text="Новый пост", author=author)
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post).exists())
+        Follow.objects.filter(user=fan).delete()
+        self.assertEqual(
+            set(
+                TimelineEntry.objects.filter(post=new_post)
+                .values_list("user__username", flat=True)
+            ),
+            {"reader", "late"},
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=late).count(), 2
+        )
+        self.assertEqual(
+            self.timeline(), [new_post, FollowTimelineTest.old_post]
+        )
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_post_author = User.objects.create_user(
+            username=AUTHOR_USERNAME
+        )
+        cls.URL_SEARCH = reverse("posts:search")
+
+    def search(self, query, **params):
+        response = self.client.get(
+            SearchViewTest.URL_SEARCH, {"q": query, **params}
+        )
+        return response.context["page_obj"]
+
+    def test_search_posts_and_comments(self):
+        author = SearchViewTest.test_post_author
+        best = Post.objects.create(text="Кошка, кошка и кошка", author=author)
+        other = Post.objects.create(text="Про собак", author=author)
+        other.comments.create(author=author, text="А у меня кошка")
+        Post.objects.create(text="Ничего общего", author=author)
+        self.assertEqual(list(self.search("КОШКА")), [best, other])
+        other.comments.all().delete()
+        best.text = "Теперь про попугаев"
+        best.save()
+        self.assertEqual(list(self.search("кошка")), [])
+        self.assertEqual(list(self.search("попугаев")), [best])
+        best.delete()
+        self.assertEqual(list(self.search("попугаев")), [])
+
+    def test_search_without_results(self):
+        Post.objects.create(
+            text="Про собак", author=SearchViewTest.test_post_author
+        )
+        response = self.client.get(SearchViewTest.URL_SEARCH, {"q": "кошка"})
+        self.assertContains(response, "Ничего не найдено")
+        response = self.client.get(SearchViewTest.URL_SEARCH)
+        self.assertNotContains(response, "Ничего не найдено")
+
+    def test_search_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=SearchViewTest.test_post_author, text=f"кот {i}")
+            for i in range(POST_COUNT + 2)
+        )
+        call_command("rebuild_search_index", stdout=StringIO())
+        first = self.search("кот")
+        second = self.search("кот", cursor=first.next_cursor)
+        self.assertEqual(len(first), POST_COUNT)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+        back = self.search("кот", cursor=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        self.client.force_login(admin)
+        Post.objects.create(text="Кошка", author=admin)
+        Post.objects.create(text="Собака", author=admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "кошка"}
+        )
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+
+@override_settings(
+    EMAIL_BACKEND="core.mail.OutboxEmailBackend",
+    OUTBOX_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    BACKGROUND_TASKS_EAGER=True,
+)
+class NotificationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username=AUTHOR_USERNAME, email="author@example.com"
+        )
+        cls.reader = User.objects.create_user(
+            username="reader", email="reader@example.com"
+        )
+
+    def test_post_author_is_notified_about_comment(self):
+        post = Post.objects.create(text="Пост", author=self.author)
+        self.client.force_login(self.reader)
+        self.client.post(
+            reverse("posts:add_comment", args=[post.id]),
+            {"text": "Отличный пост"},
+        )
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["author@example.com"])
+        self.assertIn("Отличный пост", mail.outbox[0].body)
+        post.comments.create(author=self.author, text="Сам себе")
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_followers_are_notified_about_new_post(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        silent = User.objects.create_user(username="silent")
+        Follow.objects.create(user=silent, author=self.author)
+        Post.objects.create(text="Новость для подписчиков", author=self.author)
+        self.assertEqual(
+            [message.to for message in mail.outbox], [["reader@example.com"]]
+        )
+        self.assertIn("Новость для подписчиков", mail.outbox[0].body)
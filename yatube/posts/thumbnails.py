@@ -0,0 +1,116 @@
+"""
+Фоновая подготовка миниатюр картинок постов.
+
+После сохранения картинки все размеры из POST_THUMBNAILS строятся в
+пуле процессов (core.tasks). Пока задача не выполнена, шаблон выводит
+оригинал, а не строит миниатюру внутри запроса. Упавшая задача
+запоминается в кэше на THUMBNAIL_RETRY_DELAY секунд: до этого файл
+снова в очередь не ставится. Готовая миниатюра сбрасывает кэш страниц
+постов с этой картинкой: анонимам больше не отдаётся оригинал.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from core.tasks import run_in_background, run_in_process
+
+# Версия sorl-thumbnail, с которой сверен _thumbnail_name.
+SORL_VERSION = "12.6.3"
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _failed_key(name):
+    return f"thumbnail-failed:{name}"
+
+
+def generate_thumbnails(name):
+    """Строит все миниатюры файла; выполняется в дочернем процессе."""
+    # Предел разрешения выставляет движок sorl (posts.pil.Engine).
+    from sorl.thumbnail import get_thumbnail
+
+    for geometry, options in settings.POST_THUMBNAILS.items():
+        get_thumbnail(name, geometry, **options)
+    return name
+
+
+def purge_image_pages(name):
+    """Сбрасывает кэш страниц постов, которые выводят картинку name."""
+    from .models import Post
+    from .page_cache import purge_path
+
+    for pk in Post.objects.filter(image=name).values_list("pk", flat=True):
+        purge_path(reverse("posts:post_detail", args=[pk]))
+
+
+def schedule_thumbnails(name):
+    """Ставит файл в очередь, если он не ждёт обработки и не падал."""
+    if cache.get(_failed_key(name)):
+        return
+    with _pending_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+
+    def callback(future):
+        if future.exception() is not None:
+            cache.set(
+                _failed_key(name), True, settings.THUMBNAIL_RETRY_DELAY
+            )
+        else:
+            # Колбэк идёт в служебном потоке пула, запросы к БД - в фоне.
+            run_in_background(purge_image_pages, name)
+        with _pending_lock:
+            _pending.discard(name)
+
+    run_in_process(generate_thumbnails, name, callback=callback)
+
+
+def _thumbnail_name(file_, geometry, options):
+    """
+    Имя миниатюры в хранилище ключей sorl.
+
+    Повторяет шаги ThumbnailBackend.get_thumbnail и опирается на его
+    внутренние методы, поэтому сверено с SORL_VERSION (см. тест).
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.base import ThumbnailBackend
+    from sorl.thumbnail.conf import defaults as default_settings
+    from sorl.thumbnail.conf import settings as thumbnail_settings
+    from sorl.thumbnail.images import ImageFile
+
+    backend = default.backend
+    if not isinstance(backend, ThumbnailBackend):
+        return None
+    source = ImageFile(file_)
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def get_ready_thumbnail(file_, geometry):
+    """
+    Готовая миниатюра или None.
+
+    В отличие от sorl.thumbnail.get_thumbnail ничего не строит, только
+    смотрит в хранилище ключей sorl.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.images import ImageFile
+
+    name = _thumbnail_name(
+        file_, geometry, settings.POST_THUMBNAILS.get(geometry, {})
+    )
+    if name is None:
+        return None
+    return default.kvstore.get(ImageFile(name, default.storage))
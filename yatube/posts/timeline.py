@@ -0,0 +1,137 @@
+"""
+Лента подписок с раскладкой при записи (fan-out-on-write).
+
+Новый пост автора раскладывается в TimelineEntry каждого подписчика,
+и follow_index читает готовую ленту одним запросом по индексу.
+Посты авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+не раскладываются, а подмешиваются при чтении (fan-out-on-read).
+Когда автор опускается до порога, его последние посты раскладываются
+всем подписчикам (backfill_followers), иначе они пропали бы из лент.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .counters import get_followers_count
+from .models import Follow, Post, TimelineEntry
+from .paginators import CursorPaginator
+
+BATCH_SIZE = 1000
+
+
+def is_celebrity(author_id):
+    return get_followers_count(author_id) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post_id):
+    """Раскладывает пост в ленты всех подписчиков автора."""
+    post = (
+        Post.objects.filter(pk=post_id)
+        .values("author_id", "pub_date")
+        .first()
+    )
+    if post is None:
+        return
+    followers = Follow.objects.filter(author_id=post["author_id"])
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id,
+            author_id=post["author_id"], pub_date=post["pub_date"],
+        )
+        for user_id in followers.values_list("user_id", flat=True)
+        .iterator()
+    )
+
+
+def _recent_posts(author_id):
+    return list(
+        Post.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("pk", "pub_date")
+        [:settings.TIMELINE_BACKFILL_POSTS]
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    follow = Follow.objects.filter(user_id=user_id, author_id=author_id)
+    if not follow.exists():
+        return
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id,
+            author_id=author_id, pub_date=pub_date,
+        )
+        for post_id, pub_date in _recent_posts(author_id)
+    )
+
+
+def backfill_followers(author_id):
+    """
+    Раскладывает последние посты автора всем его подписчикам.
+
+    Нужна, когда автор опустился до TIMELINE_FANOUT_LIMIT: посты,
+    написанные выше порога, и подписчики того времени во входящих
+    лентах отсутствуют. Уже разложенные записи пропускаются.
+    """
+    if is_celebrity(author_id):
+        return
+    posts = _recent_posts(author_id)
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        "user_id", flat=True
+    )
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id,
+            author_id=author_id, pub_date=pub_date,
+        )
+        for user_id in followers.iterator()
+        for post_id, pub_date in posts
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        return
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_timeline_page(user, cursor, per_page):
+    """
+    Страница ленты подписок.
+
+    Курсоры обоих путей совпадают: (pub_date, id поста).
+    """
+    celebrities = list(
+        Follow.objects.filter(
+            user=user,
+            author__post_counter__followers_count__gt=(
+                settings.TIMELINE_FANOUT_LIMIT
+            ),
+        ).values_list("author_id", flat=True)
+    )
+    if celebrities:
+        inbox = TimelineEntry.objects.filter(user=user).values("post")
+        posts = Post.objects.feed().filter(
+            Q(pk__in=inbox) | Q(author__in=celebrities)
+        )
+        return CursorPaginator(posts, per_page).get_page(cursor)
+    entries = TimelineEntry.objects.filter(user=user).select_related(
+        "post__author", "post__group"
+    )
+    page = CursorPaginator(
+        entries, per_page, ordering=("-pub_date", "-post_id")
+    ).get_page(cursor)
+    page.object_list = [entry.post for entry in page.object_list]
+    return page
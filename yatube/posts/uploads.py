@@ -0,0 +1,134 @@
+"""
+Приём картинок постов без лишней памяти.
+
+Загрузка пишется во временный файл кусками по POST_IMAGE_UPLOAD_CHUNK_SIZE,
+а проверка читает только заголовок картинки: формат и размеры известны
+до декодирования, поэтому «бомбы» отклоняются, не раскрываясь в памяти.
+Обработчик загрузки ставят только представления постов
+(accept_post_images). Предел размера проверяет поле формы PostImageField
+(и в админке) - только у новых загрузок, уже сохранённый файл не читается.
+"""
+import warnings
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+
+class StreamingImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загрузку во временный файл фиксированными кусками.
+
+    Сверх POST_IMAGE_MAX_SIZE байт данные не пишутся, а файл помечается
+    как truncated - его отклонит validate_post_image.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.POST_IMAGE_UPLOAD_CHUNK_SIZE
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.POST_IMAGE_MAX_SIZE:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.truncated = file_size > settings.POST_IMAGE_MAX_SIZE
+        return file
+
+
+def accept_post_images(view):
+    """
+    Ставит StreamingImageUploadHandler первым обработчиком загрузки.
+
+    Обработчики можно менять только до чтения request.POST, а его читает
+    CsrfViewMiddleware, поэтому CSRF проверяется уже внутри.
+    """
+    protected = csrf_protect(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(
+            0, StreamingImageUploadHandler(request)
+        )
+        return protected(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
+
+
+def validate_image_size(file):
+    """Файл не больше POST_IMAGE_MAX_SIZE."""
+    max_size = settings.POST_IMAGE_MAX_SIZE
+    if getattr(file, "truncated", False) or file.size > max_size:
+        raise ValidationError(
+            "Файл больше %(max)s МБ.",
+            code="file_too_large",
+            params={"max": max_size // (1024 * 1024)},
+        )
+
+
+def load_pillow():
+    """
+    PIL.Image с пределом POST_IMAGE_MAX_PIXELS (posts.pil). Pillow
+    загружается при первой картинке, а не при старте воркера.
+    """
+    from .pil import Image
+
+    return Image
+
+
+def validate_post_image(file):
+    """
+    Проверяет размер, формат и разрешение картинки по заголовку.
+
+    Возвращает формат картинки по версии Pillow.
+    """
+    Image = load_pillow()
+    validate_image_size(file)
+    if hasattr(file, "temporary_file_path"):
+        source = file.temporary_file_path()
+    else:
+        file.seek(0)
+        source = file
+    try:
+        with warnings.catch_warnings():
+            # Порог проверяем сами, предупреждение Pillow здесь не нужно.
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                image_format = image.format
+                width, height = image.size
+    except Image.DecompressionBombError:
+        raise ValidationError(
+            "Слишком большое разрешение картинки.", code="image_too_large"
+        )
+    except Exception as error:
+        raise ValidationError(
+            "Загрузите правильное изображение.", code="invalid_image"
+        ) from error
+    if image_format not in settings.POST_IMAGE_FORMATS:
+        raise ValidationError(
+            "Формат %(format)s не поддерживается.",
+            code="invalid_image_format",
+            params={"format": image_format},
+        )
+    max_dimension = settings.POST_IMAGE_MAX_DIMENSION
+    if (
+        width > max_dimension
+        or height > max_dimension
+        or width * height > settings.POST_IMAGE_MAX_PIXELS
+    ):
+        raise ValidationError(
+            "Слишком большое разрешение картинки: %(width)sx%(height)s.",
+            code="image_too_large",
+            params={"width": width, "height": height},
+        )
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return image_format
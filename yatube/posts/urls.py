@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "posts"
 
@@ -9,7 +9,23 @@ urlpatterns = [
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
     path("profile/<str:username>/", views.profile, name="profile"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path("create/", views.post_create, name="post_create"),
+    path("search/", views.search, name="search"),
+    path("api/posts/", api.index, name="api_index"),
+    path("api/posts/<int:post_id>/", api.post_detail, name="api_post"),
+    path(
+        "api/group/<slug:slug>/posts/", api.group_posts, name="api_group"
+    ),
+    path(
+        "api/profile/<str:username>/posts/",
+        api.profile,
+        name="api_profile",
+    ),
     path("posts/<post_id>/edit/", views.post_edit, name="edit"),
     path('posts/<int:post_id>/comment/', views.add_comment, name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),    
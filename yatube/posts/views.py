@@ -1,79 +1,170 @@
-from django.core.paginator import Paginator
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 
-from .models import Group, Post, User, Comment
+from core.queries import query_budget
+from core.routers import use_replica
+
+from .models import Comment, Follow, Group, Post, User
 from .forms import PostForm, CommentForm
+from .page_cache import cache_anonymous_page
+from .paginators import CursorPaginator, paginate
+from .search import SearchPaginator
+from .thumbnails import schedule_thumbnails
+from .uploads import accept_post_images
+from .timeline import get_timeline_page
 
 
 POST_COUNT = 10
+COMMENT_COUNT = 20
+
+
+def author_posts_count(author):
+    """Число постов автора из счётчика, без COUNT(*)."""
+    counter = getattr(author, "post_counter", None)
+    return counter.posts_count if counter else 0
+
+
+def feed_engine(view_name):
+    """Движок шаблонов ленты: "django" или "jinja2" (FEED_TEMPLATE_ENGINES)."""
+    return settings.FEED_TEMPLATE_ENGINES.get(view_name, "django")
 
 
+@cache_anonymous_page
+@use_replica
+@query_budget(3)
 def index(request):
-    post_list = Post.objects.select_related('author', 'group')
-    paginator = Paginator(post_list, POST_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.feed()
+    page_obj = paginate(request, post_list, POST_COUNT)
     context = {
         "page_obj": page_obj,
     }
-    return render(request, "posts/index.html", context)
+    return render(
+        request, "posts/index.html", context, using=feed_engine("index")
+    )
 
 
+@cache_anonymous_page
+@use_replica
+@query_budget(4)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, POST_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.feed()
+    page_obj = paginate(request, posts, POST_COUNT, count=group.posts_count)
     context = {
         "page_obj": page_obj,
         "group": group,
     }
-    return render(request, "posts/group_list.html", context)
+    return render(
+        request, "posts/group_list.html", context,
+        using=feed_engine("group_posts"),
+    )
 
 
+@cache_anonymous_page
+@use_replica
+@query_budget(4)
 def profile(request, username):
-    author = User.objects.get(username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, POST_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related("post_counter"), username=username
+    )
+    posts = author.posts.feed()
+    page_obj = paginate(
+        request, posts, POST_COUNT, count=author_posts_count(author)
+    )
+    following = (
+        request.user.is_authenticated
+        and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         "page_obj": page_obj,
         "author": author,
+        "following": following,
     }
-    return render(request, "posts/profile.html", context)
+    return render(
+        request, "posts/profile.html", context, using=feed_engine("profile")
+    )
 
 
+@query_budget(4)
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page_obj = None
+    if query:
+        page_obj = SearchPaginator(query, POST_COUNT).get_page(
+            request.GET.get("cursor")
+        )
+    context = {
+        "page_obj": page_obj,
+        "query": query,
+    }
+    return render(request, "posts/search.html", context)
+
+
+def comments_page(post_id, cursor=None):
+    """Порция комментариев поста по ключу (created, id), один запрос."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        "author"
+    )
+    return CursorPaginator(
+        comments, COMMENT_COUNT, ordering=("created", "id")
+    ).get_page(cursor)
+
+
+@cache_anonymous_page
+@use_replica
+@query_budget(4)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post)
+    post = get_object_or_404(
+        Post.objects.select_related("author__post_counter", "group"),
+        pk=post_id
+    )
     context = {
         "post": post,
-        "comments": comments,
+        "comments": comments_page(post.pk),
         "form": CommentForm()
     }
     return render(request, "posts/post_detail.html", context)
 
 
+@cache_anonymous_page
+@use_replica
+@query_budget(3)
+def post_comments(request, post_id):
+    """Следующая порция комментариев (подгружается со страницы поста)."""
+    context = {
+        "post_id": post_id,
+        "comments": comments_page(post_id, request.GET.get("cursor")),
+    }
+    return render(request, "posts/includes/comments.html", context)
+
+
 @login_required
+@query_budget(3)
+@accept_post_images
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(request, "posts/create_post.html", {
             "form": form,
             "edit": False})
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with transaction.atomic():
+        post.save()
+        if post.image:
+            schedule_thumbnails(post.image.name)
     return redirect("posts:profile", request.user)
 
 
 @login_required
+@query_budget(4)
+@accept_post_images
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:profile', post.author)
     form = PostForm(
         request.POST or None,
@@ -82,12 +173,15 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         post = form.save()
+        if "image" in form.changed_data and post.image:
+            schedule_thumbnails(post.image.name)
         return redirect("posts:post_detail", post_id=post.id)
     return render(
         request, "posts/create_post.html", {"form": form, "edit": True,
                                             'id_post': post.id}
     )
 
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -96,23 +190,33 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
+
 @login_required
+@query_budget(4)
 def follow_index(request):
-    # информация о текущем пользователе доступна в переменной request.user
-    # ...
-    context = {}
-    return render(request, 'posts/follow.html', context)
+    page_obj = get_timeline_page(
+        request.user, request.GET.get("cursor"), POST_COUNT
+    )
+    context = {
+        "page_obj": page_obj,
+    }
+    return render(request, "posts/follow.html", context)
+
 
 @login_required
 def profile_follow(request, username):
-    # Подписаться на автора
-    ...
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect("posts:profile", username=username)
+
 
 @login_required
 def profile_unfollow(request, username):
-    # Дизлайк, отписка
-    ...
- 
\ No newline at end of file
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return redirect("posts:profile", username=username)
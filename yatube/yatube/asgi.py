@@ -0,0 +1,24 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+for example ``uvicorn yatube.asgi:application``. See core.asgi.
+"""
+
+import os
+
+from django.conf import settings
+
+from core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+# Воркеру админка нужна редко: admin.py загрузятся при первом /admin/.
+os.environ.setdefault("YATUBE_LAZY_ADMIN", "1")
+
+application = get_asgi_application()
+
+if settings.WARMUP_ON_START:
+    from core.warmup import warm_up
+
+    # Прогрев до того, как сервер начнёт отдавать воркеру запросы.
+    warm_up()
@@ -0,0 +1,45 @@
+"""
+Окружение Jinja2 для шаблонов из jinja_templates/.
+
+Повторяет нужное лентам из Django-шаблонов: url, static, now, карточки
+постов (posts.cards с движком "jinja2"), миниатюры и фильтры date,
+linebreaks, truncatechars. Фильтры Django возвращают SafeText, Jinja2
+не экранирует его повторно (__html__).
+"""
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template import defaultfilters
+from django.urls import reverse
+from django.utils import timezone
+from jinja2 import Environment
+
+from posts.cards import render_cards
+from posts.templatetags.post_thumbnails import post_thumbnail
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def now(format_string):
+    return defaultfilters.date(timezone.localtime(), format_string)
+
+
+def post_cards(posts, profile=False, group=False):
+    return render_cards(posts, profile=profile, group=group, using="jinja2")
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        "url": url,
+        "static": staticfiles_storage.url,
+        "now": now,
+        "post_cards": post_cards,
+        "thumbnail": post_thumbnail,
+    })
+    env.filters.update({
+        "date": defaultfilters.date,
+        "linebreaks": defaultfilters.linebreaks_filter,
+        "truncatechars": defaultfilters.truncatechars,
+    })
+    return env
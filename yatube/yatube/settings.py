@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import importlib.util
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -30,10 +32,124 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media') 
 
+# Кэш: "shared" - общий для всех воркеров хоста файл SQLite с LRU,
+# "local" - свой в каждом процессе, "memcached" - внешний сервер.
+# Файл "shared" лежит в кэш-каталоге пользователя (~/.cache/yatube), а не
+# в общем /tmp и не в дереве исходников: значения в нём - pickle, писать
+# туда может только владелец (0600).
+CACHE_BACKEND = os.environ.get("YATUBE_CACHE_BACKEND", "shared")
+CACHE_BACKENDS = {
+    "shared": {
+        "BACKEND": "core.cache.SQLiteCache",
+        "LOCATION": os.environ.get(
+            "YATUBE_CACHE_LOCATION",
+            os.path.join(
+                os.environ.get(
+                    "XDG_CACHE_HOME", os.path.expanduser("~/.cache")
+                ),
+                "yatube", "cache.sqlite3",
+            ),
+        ),
+        "OPTIONS": {
+            "MAX_ENTRIES": 50000,
+        },
+    },
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "memcached": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": os.environ.get("YATUBE_CACHE_LOCATION", "127.0.0.1:11211"),
+    },
+}
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    "default": CACHE_BACKENDS[CACHE_BACKEND],
+}
+# Тесты (manage.py test и pytest) получают свой кэш в памяти процесса:
+# записи прошлых запусков и работающего сайта им не попадаются.
+if sys.argv[1:2] == ["test"] or "pytest" in sys.modules:
+    CACHES = {"default": CACHE_BACKENDS["local"]}
+
+# Время жизни отрисованной карточки поста в кэше, секунды.
+# Изменения сбрасываются сигналами, таймаут лишь ограничивает объём.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Время жизни страницы в кэше для анонимов, секунды. Первые страницы
+# сбрасываются сигналами, дальние устаревают не дольше этого таймаута.
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Паджинация лент: "cursor" - по ключу (pub_date, id) без COUNT и OFFSET,
+# "page" - классическая постраничная с номерами страниц.
+POSTS_PAGINATION = "cursor"
+
+# JSON API (posts.api): постов на странице по умолчанию и максимум ?limit.
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
+
+# Фоновые задачи (core.tasks): размер пула потоков воркера и режим
+# немедленного выполнения для тестов и отладки.
+BACKGROUND_TASK_WORKERS = 4
+BACKGROUND_PROCESS_WORKERS = os.cpu_count()
+BACKGROUND_TASKS_EAGER = False
+
+# ASGI (core.asgi): потоки, в которых выполняются middleware и
+# представления. Медленные клиенты потоков не занимают.
+ASGI_THREADS = 16
+
+# Лента подписок: авторам с большим числом подписчиков посты
+# не раскладываются по лентам, а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+# Сколько последних постов автора добавить в ленту при подписке.
+TIMELINE_BACKFILL_POSTS = 1000
+
+# Размеры миниатюр картинок постов, которые строятся заранее в фоне
+# (posts.thumbnails): геометрия sorl-thumbnail -> опции.
+POST_THUMBNAILS = {
+    "960x339": {"crop": "center", "upscale": True},
+}
+# Через сколько секунд снова пробовать файл, миниатюра которого не
+# построилась.
+THUMBNAIL_RETRY_DELAY = 60 * 30
+# Движок sorl-thumbnail с пределом разрешения POST_IMAGE_MAX_PIXELS.
+THUMBNAIL_ENGINE = "posts.pil.Engine"
+
+# Загрузка картинок постов (posts.uploads): в представлениях постов
+# пишется на диск кусками, проверяется по заголовку без декодирования.
+POST_IMAGE_UPLOAD_CHUNK_SIZE = 64 * 1024
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_DIMENSION = 10000
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+
+# Бэкенд полнотекстового поиска (posts.search): SqliteFTS5Backend для
+# SQLite, LikeSearchBackend для СУБД без FTS5.
+POSTS_SEARCH_BACKEND = "posts.search.SqliteFTS5Backend"
+
+# Профилирование (core.profiling): доля подробно профилируемых запросов,
+# порог медленного запроса в секундах и адреса, которым виден /metrics.
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_SLOW_REQUEST = 0.5
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "slow_requests": {
+            "class": "logging.StreamHandler",
+            "formatter": "json",
+        },
+    },
+    "loggers": {
+        "yatube.slow_requests": {
+            "handlers": ["slow_requests"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
 }
 
 ALLOWED_HOSTS = [
@@ -51,7 +167,7 @@ LOGIN_REDIRECT_URL = "posts:index"
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "core.apps.AdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -64,7 +180,17 @@ INSTALLED_APPS = [
     "sorl.thumbnail",
 ]
 
+# Воркеры (yatube/wsgi.py) загружают admin.py приложений при первом
+# запросе к админке, manage.py и тесты - сразу.
+ADMIN_LAZY_AUTODISCOVER = os.getenv("YATUBE_LAZY_ADMIN") == "1"
+
+# Прогрев воркера перед приёмом запросов (core.warmup): URLconf,
+# шаблоны в кэширующем загрузчике, переводы LANGUAGE_CODE.
+WARMUP_ON_START = os.getenv("YATUBE_WARMUP", "1") != "0"
+
 MIDDLEWARE = [
+    "core.profiling.ProfilingMiddleware",
+    "core.routers.ReplicaPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -94,19 +220,87 @@ TEMPLATES = [
     },
 ]
 
+# Jinja2 - необязательная зависимость (pip install Jinja2): быстрый
+# движок для шаблонов лент из каталога jinja_templates/. Какие ленты им
+# отрисовывать, задаёт YATUBE_JINJA2_VIEWS через запятую, например
+# "index,group_posts,profile"; без Jinja2 все ленты идут через Django.
+JINJA2_AVAILABLE = importlib.util.find_spec("jinja2") is not None
+if JINJA2_AVAILABLE:
+    TEMPLATES.append({
+        "BACKEND": "django.template.backends.jinja2.Jinja2",
+        "DIRS": [os.path.join(BASE_DIR, "jinja_templates")],
+        "APP_DIRS": False,
+        "OPTIONS": {
+            "environment": "yatube.jinja_env.environment",
+            "context_processors": [
+                "django.contrib.auth.context_processors.auth",
+            ],
+        },
+    })
+FEED_TEMPLATE_ENGINES = dict.fromkeys(
+    ("index", "group_posts", "profile"), "django"
+)
+if JINJA2_AVAILABLE:
+    for view in filter(None, os.getenv("YATUBE_JINJA2_VIEWS", "").split(",")):
+        FEED_TEMPLATE_ENGINES[view.strip()] = "jinja2"
+
 WSGI_APPLICATION = "yatube.wsgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Профиль SQLite (core.db): "tuned" - WAL и PRAGMA для конкурентной
+# работы и постоянные соединения воркера, "default" - настройки SQLite
+# как есть и новое соединение на каждый запрос.
+SQLITE_PROFILE = os.environ.get("YATUBE_SQLITE_PROFILE", "tuned")
+SQLITE_PROFILES = {
+    "tuned": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            # Отрицательное значение - в килобайтах: 64 МБ.
+            "cache_size": -64 * 1024,
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+        "conn_max_age": 600,
+    },
+    "default": {
+        "pragmas": {},
+        "conn_max_age": 0,
+    },
+}
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]["pragmas"]
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": SQLITE_PROFILES[SQLITE_PROFILE]["conn_max_age"],
     }
 }
 
+# Реплики для чтения лент (core.routers): пути к файлам SQLite через
+# запятую, у каждой реплики свой алиас replica1, replica2...
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.environ.get("YATUBE_DB_REPLICAS", "").split(",")), 1
+):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": path,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+# Сколько секунд после записи посетитель читает с default (пока реплики
+# догоняют) и как часто перепроверять здоровье реплики.
+REPLICA_PIN_SECONDS = 5
+REPLICA_HEALTH_INTERVAL = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -146,8 +340,35 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
-
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# collectstatic (core.storage) собирает сюда файлы с хэшем в имени,
+# минифицирует CSS/JS и пишет сжатые копии .gz и .br (с Brotli).
+STATIC_ROOT = os.getenv(
+    "YATUBE_STATIC_ROOT", os.path.join(BASE_DIR, "staticfiles")
+)
+STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage"
+STATIC_COMPRESS_EXTENSIONS = (
+    ".css", ".js", ".svg", ".ico", ".json", ".txt", ".xml", ".map",
+)
+STATIC_BUILD_WORKERS = os.cpu_count()
+# Отдавать STATIC_ROOT из Django (core.views.static_file), если перед
+# воркерами нет веб-сервера со статикой. Хэшированные имена уходят с
+# Cache-Control: immutable на STATIC_MAX_AGE секунд, остальные
+# перепроверяются через STATIC_UNHASHED_MAX_AGE секунд.
+STATIC_SERVE = os.getenv("YATUBE_SERVE_STATIC") == "1"
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_UNHASHED_MAX_AGE = 60 * 60
+
+# Письма ставятся в очередь (core.mail), а отправляет их фоновый
+# отправитель через OUTBOX_EMAIL_BACKEND: в продакшене - SMTP,
+# здесь - filebased.EmailBackend.
+EMAIL_BACKEND = "core.mail.OutboxEmailBackend"
+OUTBOX_EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Писем за одну пачку, попыток на письмо и задержка первого повтора
+# в секундах (дальше удваивается).
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+# Адрес сайта для ссылок в письмах.
+SITE_URL = "http://127.0.0.1:8000"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
@@ -1,20 +1,30 @@
-from django.contrib import admin
-from django.urls import include, path
+import re
+
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from core.lazy_admin import admin_urls
+from core.views import metrics, static_file
 from posts import views
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
+    admin_urls("admin/"),
     path("", include("posts.urls", namespace="posts")),
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("about.urls", namespace="about")),
+    path("metrics", metrics, name="metrics"),
     path('posts/<int:post_id>/comment/', views.add_comment, name='add_comment'),
 ]
 
 handler404 = 'core.views.page_not_found'
 
+if settings.STATIC_SERVE:
+    urlpatterns.append(re_path(
+        r"^{}(?P<path>.+)$".format(re.escape(settings.STATIC_URL.lstrip("/"))),
+        static_file,
+    ))
+
 if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+# Воркеру админка нужна редко: admin.py загрузятся при первом /admin/.
+os.environ.setdefault("YATUBE_LAZY_ADMIN", "1")
 
 application = get_wsgi_application()
+
+if settings.WARMUP_ON_START:
+    from core.warmup import warm_up
+
+    # Прогрев до того, как сервер начнёт отдавать воркеру запросы.
+    warm_up()